@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from Players import PLAYER_NAMES
+
+# Default BubbeRating weights
+TRADE_WEIGHT = 0.5
+BEER_WEIGHT = 0.9
+
+
+def bubbe_rating(hltv, trade_attempts, beer_per_game, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """
+    BubbeRating = HLTV + HLTV * beer per game * beer_weight + trade attempts (%) / 100 * trade_weight.
+    Works on scalars, arrays and Series. For a single game, beer per game is that game's beer.
+    """
+    return hltv + hltv * (beer_per_game * beer_weight) + (trade_attempts / 100) * trade_weight
+
+
+def player_features(df):
+    """Per-player mean HLTV, mean trade attempts and beer per game played, from per-game stats rows (by player_key)."""
+    features = df.groupby("player_key").agg(
+        hltv=("HLTV Rating", "mean"),
+        trade=("TradeAttempts", "mean"),
+        beer=("Beer", "sum"),
+        games=("Game", "nunique"),
+    )
+    features["beer_per_game"] = features["beer"] / features["games"]
+    return features
+
+
+def weight_grid(trade_weights, beer_weights):
+    """All (trade_weight, beer_weight) combinations as two flat arrays."""
+    trade, beer = np.meshgrid(np.asarray(trade_weights, float), np.asarray(beer_weights, float), indexing="ij")
+    return trade.ravel(), beer.ravel()
+
+
+def sweep(df, trade_weights, beer_weights, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """
+    Evaluate BubbeRating for every weight combination over the whole per-player history in one broadcast.
+    Returns (stability, combos):
+      stability: per player, share of combos ranked #1 / top 3, mean, best and worst rank
+      combos: per combination, the #1 player and Spearman correlation with the ranking at the given weights
+    """
+    features = player_features(df)
+    players = PLAYER_NAMES[features.index.to_numpy()]
+    hltv = features["hltv"].to_numpy()
+    trade = features["trade"].to_numpy() / 100
+    beer = features["beer_per_game"].to_numpy()
+
+    trade_w, beer_w = weight_grid(trade_weights, beer_weights)
+    # (combos, players) ratings in one broadcast
+    ratings = hltv[None, :] + np.outer(beer_w, hltv * beer) + np.outer(trade_w, trade)
+
+    # Rank 1 = best; argsort of argsort gives each player's position per combination
+    ranks = np.argsort(np.argsort(-ratings, axis=1, kind="stable"), axis=1) + 1
+
+    baseline = bubbe_rating(hltv, trade * 100, beer, trade_weight, beer_weight)
+    baseline_ranks = np.argsort(np.argsort(-baseline, kind="stable")) + 1
+    n = len(players)
+    if n > 1:
+        d2 = ((ranks - baseline_ranks[None, :]) ** 2).sum(axis=1)
+        spearman = 1 - 6 * d2 / (n * (n ** 2 - 1))
+    else:
+        spearman = np.ones(len(trade_w))
+
+    stability = pd.DataFrame({
+        "Player": players,
+        "Baseline rank": baseline_ranks,
+        "Share #1": (ranks == 1).mean(axis=0),
+        "Share top 3": (ranks <= 3).mean(axis=0),
+        "Mean rank": ranks.mean(axis=0),
+        "Best rank": ranks.min(axis=0),
+        "Worst rank": ranks.max(axis=0),
+    }).sort_values("Mean rank").reset_index(drop=True)
+
+    combos = pd.DataFrame({
+        "trade_weight": trade_w,
+        "beer_weight": beer_w,
+        "top_player": players[ranks.argmin(axis=1)] if n else [],
+        "spearman_vs_baseline": spearman,
+    })
+    return stability, combos
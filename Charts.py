@@ -0,0 +1,54 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+# Above these sizes the Stats chart is aggregated server-side before plotting
+MAX_GAME_BARS = 12
+# Above this many per-game points (games x players) the chart is drawn as WebGL lines instead of bars
+MAX_BAR_POINTS = 240
+
+
+def data_version(df):
+    """Content hash of a stats frame, used in the figure cache key."""
+    if df is None or df.empty:
+        return 0
+    return int(pd.util.hash_pandas_object(df, index=False).sum())
+
+
+def aggregate_stat(df, stat):
+    """
+    Downsample per-game rows to what the chart needs.
+    Few games: one bar per game. More: per-week buckets (sum for Beer/Water, mean otherwise).
+    Many points (games x players): every game as a point on one line per player, drawn with WebGL.
+    Returns (frame, mode) where mode is 'game', 'week' or 'trend'.
+    """
+    if df["Game"].nunique() <= MAX_GAME_BARS:
+        return df[["Player", "Game", stat]], "game"
+    if len(df) > MAX_BAR_POINTS:
+        trend = df[["Date", "Player", stat]].assign(Date=pd.to_datetime(df["Date"]))
+        return trend.sort_values("Date", kind="stable"), "trend"
+
+    how = "sum" if stat in ("Beer", "Water") else "mean"
+    weekly = df.assign(Week=pd.to_datetime(df["Date"]).dt.to_period("W").dt.start_time)
+    weekly = weekly.groupby(["Week", "Player"], as_index=False)[stat].agg(how)
+    weekly["Week"] = weekly["Week"].dt.strftime("Uke %V (%d.%m.%y)")
+    return weekly, "week"
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def stat_figure(_df, _grouped, stat, days, version, weights=None):
+    """Build the Stats page figure. Cached by (stat, days, version, weights); the frames are not hashed."""
+    if stat == "BubbeRating":
+        return px.bar(_grouped, x="Player", y="BubbeRating",
+                      title="BubbeRating per Player")
+
+    chart_df, mode = aggregate_stat(_df, stat)
+    if mode == "game":
+        return px.bar(chart_df, x="Player", y=stat, color="Game",
+                      barmode="group", title=f"{stat} per Player")
+    if mode == "week":
+        return px.bar(chart_df, x="Player", y=stat, color="Week",
+                      barmode="group", title=f"{stat} per Player per Week")
+    # Many points: one WebGL line per player over every game
+    return px.line(chart_df, x="Date", y=stat, color="Player", markers=True,
+                   render_mode="webgl", title=f"{stat} per Game")
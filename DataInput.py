@@ -1,153 +1,519 @@
+import re
+import threading
+import time
 import gspread
 from google.oauth2.service_account import Credentials
 import pandas as pd
 from datetime import datetime, timedelta
 import streamlit as st
+from Memory import AppendBuffer, deep_sizeof
+from Players import UNKNOWN_PLAYER, player_key, player_keys
+from Snapshot import recorded, snapshot_mode, OfflineSheetsClient
 
 # Google Sheets ID
 SHEET_ID = "19vqg2lx3hMCEj7MtxkISzsYz0gUaCLgSV11q-YYtXQY"
 
 # Google Sheets authentication
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-service_account_info = dict(st.secrets["service_account"])
-service_account_info["private_key"] = service_account_info["private_key"].replace("\\n", "\n")
-creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+_creds = None
+
+
+def get_credentials():
+    """Service account credentials, loaded from secrets on first use."""
+    global _creds
+    if _creds is None:
+        service_account_info = dict(st.secrets["service_account"])
+        service_account_info["private_key"] = service_account_info["private_key"].replace("\\n", "\n")
+        _creds = Credentials.from_service_account_info(service_account_info, scopes=SCOPES)
+    return _creds
+
 
 def connect_to_gsheet():
-    return gspread.authorize(creds)
+    if snapshot_mode() == "replay":
+        return OfflineSheetsClient()
+    return gspread.authorize(get_credentials())
+
+
+# Process-wide record of what is already in Sheets, shared by all sessions.
+# Every write checks and updates these under _write_lock, so upserts are idempotent.
+_write_lock = threading.Lock()
+_saved_entry_ids = set()
+_konsum_rows = {}  # (game_id, player_name) -> row number in the 'konsum' sheet
+# False until the ledger sheet has been read once; until then ledger writes read it first (see _ledger_for_write)
+_ledger_loaded = False
+
+
+def _remember_sheet_keys(games_df, konsum_df, ledger_df):
+    global _ledger_loaded
+    with _write_lock:
+        if not konsum_df.empty:
+            _konsum_rows.update({
+                key: i + 2 for i, key in enumerate(zip(konsum_df['game_id'], konsum_df['player_name']))
+            })
+        if ledger_df is not None:
+            _saved_entry_ids.update(ledger_df.index)
+            _ledger_loaded = True
+
+
+def _appended_row_number(response):
+    """Row number from an append_row response ('konsum!A12:E12' -> 12)."""
+    updated_range = (response or {}).get("updates", {}).get("updatedRange", "")
+    match = re.search(r"![A-Z]+(\d+)", updated_range)
+    return int(match.group(1)) if match else None
+
+
+# Konsum ledger: one row per Supabase entry id, counts are derived by aggregation
+LEDGER_SHEET = "konsum_ledger"
+LEDGER_COLUMNS = ["entry_id", "game_id", "player_name", "drink_type"]
+
+
+def empty_ledger():
+    ledger = pd.DataFrame(columns=LEDGER_COLUMNS[1:], index=pd.Index([], dtype="int64", name="entry_id"))
+    return ledger.assign(player_key=pd.Series(dtype="int16"))
+
+
+def ledger_from_values(values):
+    """Build the ledger frame from sheet values, indexed (unique) by entry_id, with the resolved player_key."""
+    if not values or len(values) < 2:
+        return empty_ledger()
+    ledger = pd.DataFrame(values[1:], columns=values[0])
+    ledger["entry_id"] = pd.to_numeric(ledger["entry_id"], errors="coerce")
+    ledger = ledger.dropna(subset=["entry_id"]).astype({"entry_id": "int64"})
+    ledger["player_key"] = player_keys(ledger["player_name"])
+    return ledger.drop_duplicates("entry_id").set_index("entry_id")
+
+
+def get_ledger_worksheet(spreadsheet):
+    """Open the ledger worksheet for a write, creating it with a header row the first time."""
+    try:
+        return spreadsheet.worksheet(LEDGER_SHEET)
+    except gspread.WorksheetNotFound:
+        sheet = spreadsheet.add_worksheet(LEDGER_SHEET, rows=1000, cols=len(LEDGER_COLUMNS))
+        sheet.append_row(LEDGER_COLUMNS)
+        return sheet
+
+
+@recorded("fetch_all_sheets_data")
+def read_all_sheets():
+    """Read the 'games', 'konsum' and 'konsum_ledger' sheets. Raises on Sheets errors."""
+    client = connect_to_gsheet()
+    spreadsheet = client.open_by_key(SHEET_ID)
+
+    # Games sheet
+    games_sheet = spreadsheet.worksheet("games")
+    games_data = games_sheet.get_all_values()
+    games_df = pd.DataFrame(games_data[1:], columns=games_data[0]) if games_data else pd.DataFrame()
+
+    # Konsum sheet
+    konsum_sheet = spreadsheet.worksheet("konsum")
+    konsum_data = konsum_sheet.get_all_values()
+    konsum_df = pd.DataFrame(konsum_data[1:], columns=konsum_data[0]) if konsum_data else pd.DataFrame()
+
+    # Konsum ledger sheet (None if it could not be read)
+    ledger_df = read_ledger(spreadsheet)
+    return games_df, konsum_df, ledger_df
+
+
+def read_ledger(spreadsheet):
+    """The ledger frame, empty if the sheet does not exist yet (it is only created on write), None on errors."""
+    try:
+        return ledger_from_values(spreadsheet.worksheet(LEDGER_SHEET).get_all_values())
+    except gspread.WorksheetNotFound:
+        return empty_ledger()
+    except Exception as e:
+        print(f"⚠️ Error reading the konsum ledger, using the 'konsum' sheet counts: {e}")
+        return None
 
 
 def fetch_all_sheets_data():
-    """Fetch all data from 'games' and 'konsum' sheets once."""
+    """
+    Fetch all data from 'games', 'konsum' and 'konsum_ledger' sheets once.
+    ledger_df is None when only the ledger could not be read; games and konsum are still returned.
+    """
     try:
-        client = connect_to_gsheet()
-        spreadsheet = client.open_by_key(SHEET_ID)
-        
-        # Games sheet
-        games_sheet = spreadsheet.worksheet("games")
-        games_data = games_sheet.get_all_values()
-        games_df = pd.DataFrame(games_data[1:], columns=games_data[0]) if games_data else pd.DataFrame()
-        
-        # Konsum sheet
-        konsum_sheet = spreadsheet.worksheet("konsum")
-        konsum_data = konsum_sheet.get_all_values()
-        konsum_df = pd.DataFrame(konsum_data[1:], columns=konsum_data[0]) if konsum_data else pd.DataFrame()
-        
-        return games_df, konsum_df
+        sheets = read_all_sheets()
+        if sheets is None:
+            raise LookupError("no Sheets data in the snapshot")
+        games_df, konsum_df, ledger_df = sheets
+
+        _remember_sheet_keys(games_df, konsum_df, ledger_df)
+        return games_df, konsum_df, ledger_df
     except Exception as e:
         print(f"⚠️ Error fetching Sheets data: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame(), pd.DataFrame(), None
 
 
-def save_game_data(game_id, map_name, match_result, score_team1, score_team2, game_finished_at):
-    """Save a game to Sheets and update session_state."""
-    client = connect_to_gsheet()
-    sheet = client.open_by_key(SHEET_ID).worksheet("games")
+def konsum_counts(konsum_df, ledger_df):
+    """
+    Beer/water per (game_id, player_key), aggregated from the ledger. Players outside the dimension are dropped.
+    Rows of the old 'konsum' sheet are only used for pairs the ledger has no entries for.
+    ledger_df may be None (ledger unreadable): the 'konsum' sheet counts are used alone.
+    """
+    legacy = pd.DataFrame(columns=["game_id", "player_key", "beer", "water"])
+    if not konsum_df.empty:
+        legacy = konsum_df[["game_id", "beer", "water"]].assign(player_key=player_keys(konsum_df["player_name"]))
+        for col in ("beer", "water"):
+            legacy[col] = pd.to_numeric(legacy[col], errors="coerce").fillna(0).astype(int)
+        legacy = legacy[legacy["player_key"] != UNKNOWN_PLAYER][["game_id", "player_key", "beer", "water"]]
 
-    existing_games = st.session_state.get('games_df', pd.DataFrame())
-    if game_id in existing_games.get('game_id', []):
-        return
+    if ledger_df is None:
+        ledger_df = empty_ledger()
+    ledger_df = ledger_df[ledger_df["player_key"] != UNKNOWN_PLAYER]
+    if ledger_df.empty:
+        return legacy.reset_index(drop=True)
+
+    counts = (
+        ledger_df.groupby(["game_id", "player_key", "drink_type"]).size()
+        .unstack("drink_type", fill_value=0)
+        .reindex(columns=["beer", "water"], fill_value=0)
+        .reset_index()
+    )
+    counts.columns.name = None
+    merged = pd.concat([counts, legacy], ignore_index=True)
+    return merged.drop_duplicates(["game_id", "player_key"], keep="first").reset_index(drop=True)
+
+
+class KonsumState:
+    """
+    Beer/water per (game_id, player_key), shared by all sessions of the process.
+    Inserted ledger entries and manual saves are applied to the counts directly, so an insert costs
+    O(entries) instead of re-aggregating the ledger.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.legacy = {}  # (game_id, player_key) -> [beer, water] from the old 'konsum' sheet
+        self.ledger = {}  # (game_id, player_key) -> [beer, water] from the ledger
+        self.players = {}  # game_id -> set of player_keys with counts
+        self._added = {}  # entry_id -> (game_id, player_key, drink_type) applied since the last load
+
+    @staticmethod
+    def _counts(df):
+        return {(g, int(k)): [int(b), int(w)] for g, k, b, w in zip(df["game_id"], df["player_key"], df["beer"], df["water"])}
+
+    def load(self, konsum_df, ledger_df=None):
+        """
+        Replace the counts with fresh Sheets frames. With ledger_df None (ledger unreadable) the current
+        ledger counts are kept. Entries applied after the Sheets read started are re-applied.
+        """
+        legacy = self._counts(konsum_counts(konsum_df, None))
+        ledger = self._counts(konsum_counts(pd.DataFrame(), ledger_df)) if ledger_df is not None else None
+        with self._lock:
+            self.legacy = legacy
+            if ledger is not None:
+                self.ledger = ledger
+            self.players = {}
+            for game_id, key in (*self.legacy, *self.ledger):
+                self.players.setdefault(game_id, set()).add(key)
+            if ledger is not None:
+                self._added = {i: e for i, e in self._added.items() if i not in ledger_df.index}
+                for game_id, key, drink_type in self._added.values():
+                    self._add(game_id, key, drink_type)
+
+    def _add(self, game_id, key, drink_type):
+        counts = self.ledger.setdefault((game_id, key), [0, 0])
+        counts[0 if drink_type == "beer" else 1] += 1
+        self.players.setdefault(game_id, set()).add(key)
+
+    def add_entries(self, entries):
+        """Count ledger rows (indexed by entry_id, with game_id, player_key and drink_type) that were just inserted."""
+        with self._lock:
+            for entry_id, game_id, key, drink_type in zip(entries.index, entries["game_id"], entries["player_key"], entries["drink_type"]):
+                if key == UNKNOWN_PLAYER or drink_type not in ("beer", "water"):
+                    continue
+                self._added[entry_id] = (game_id, int(key), drink_type)
+                self._add(game_id, int(key), drink_type)
+
+    def set_legacy(self, game_id, key, beer, water):
+        """A manual save to the old 'konsum' sheet."""
+        if key == UNKNOWN_PLAYER:
+            return
+        with self._lock:
+            self.legacy[(game_id, key)] = [int(beer), int(water)]
+            self.players.setdefault(game_id, set()).add(key)
+
+    def for_game(self, game_id):
+        """{player_key: {'beer', 'water'}}; ledger counts win over the old 'konsum' sheet."""
+        with self._lock:
+            result = {}
+            for key in self.players.get(game_id, ()):
+                beer, water = self.ledger.get((game_id, key)) or self.legacy[(game_id, key)]
+                result[key] = {'beer': beer, 'water': water}
+            return result
+
+    def game_version(self, game_id):
+        """Changes exactly when the game's counts do, in every session and across reloads."""
+        return hash(tuple(sorted((key, c['beer'], c['water']) for key, c in self.for_game(game_id).items())))
+
+
+# One konsum state per process, read by every session
+shared_konsum = KonsumState()
+
+
+def set_konsum_state(konsum_df, ledger_df):
+    """Load fresh Sheets frames into the shared konsum counts (ledger_df None keeps the current ledger counts)."""
+    shared_konsum.load(konsum_df, ledger_df)
+
+
+# --- Shared games table ---
 
-    sheet.append_row([game_id, map_name, match_result, int(score_team1), int(score_team2), game_finished_at])
-    
-    new_row = pd.DataFrame([{
-        'game_id': game_id,
-        'map_name': map_name,
-        'match_result': match_result,
-        'score_team1': int(score_team1),
-        'score_team2': int(score_team2),
-        'game_finished_at': game_finished_at
-    }])
-    st.session_state['games_df'] = pd.concat([existing_games, new_row], ignore_index=True)
+GAMES_DTYPES = {
+    'game_id': object, 'map_name': object, 'match_result': object,
+    'score_team1': 'int64', 'score_team2': 'int64', 'game_finished_at': 'datetime64[ns]',
+}
+
+
+def typed_games(games):
+    """'games' sheet frame or game_records() dicts -> typed rows, one per game_id (first wins)."""
+    df = pd.DataFrame(games).reindex(columns=list(GAMES_DTYPES))
+    for col in ('score_team1', 'score_team2'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype('int64')
+    df['game_finished_at'] = pd.to_datetime(df['game_finished_at'], errors='coerce')
+    return df.dropna(subset=['game_id']).drop_duplicates('game_id').reset_index(drop=True)
+
+
+class GamesTable:
+    """
+    The 'games' sheet, shared by all sessions of the process instead of a frame per session.
+    Rows live in an AppendBuffer, so adding games does not copy the table. version changes with every
+    change, and frame() is built once per version for all sessions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = AppendBuffer(GAMES_DTYPES)
+        self.ids = set()
+        self.version = 0
+        self.loaded = False
+        self._added = []  # frames of typed rows added since the last load
+        self._frame = None
+
+    def __contains__(self, game_id):
+        return game_id in self.ids
+
+    def _append(self, rows):
+        rows = rows[~rows['game_id'].isin(self.ids)]
+        if not rows.empty:
+            self.rows.append(rows)
+            self.ids.update(rows['game_id'])
+            self.version += 1
+            self._frame = None
+        return rows
+
+    def load(self, games_df):
+        """Replace the rows with a fresh 'games' sheet read. Games added after the read started are kept."""
+        rows = typed_games(games_df)
+        with self._lock:
+            self.rows = AppendBuffer(GAMES_DTYPES, capacity=max(64, 2 * len(rows)))
+            self.ids = set()
+            self._append(rows)
+            self._added = [added[~added['game_id'].isin(self.ids)] for added in self._added]
+            self._added = [added for added in self._added if not added.empty]
+            for added in self._added:
+                self._append(added)
+            self.version += 1
+            self._frame = None
+            self.loaded = self.loaded or not rows.empty
+
+    def add(self, records):
+        """Add games (game_records() dicts); returns the records that were new."""
+        with self._lock:
+            rows = self._append(typed_games(records))
+            if not rows.empty:
+                self._added.append(rows)
+            new_ids = set(rows['game_id'])
+            return [r for r in records if r['game_id'] in new_ids]
+
+    def frame(self):
+        """All games as one DataFrame, shared read-only by every session."""
+        with self._lock:
+            if self._frame is None:
+                self._frame = self.rows.frame()
+            return self._frame
+
+
+# One games table per process, read by every session
+shared_games = GamesTable()
+
+
+def game_records(games):
+    """Sheet rows (as dicts) for games in the games_from_profile() format."""
+    return [{
+        'game_id': g["game_id"],
+        'map_name': g["map_name"],
+        'match_result': g["match_result"],
+        'score_team1': int(g["scores"][0]),
+        'score_team2': int(g["scores"][1]),
+        'game_finished_at': g["game_finished_at"]
+    } for g in games]
+
+
+def append_game_rows(records):
+    """
+    Append games to the 'games' sheet in one call, skipping any already saved, and add them to the
+    shared games table. Safe from background threads. Returns those written.
+    """
+    with _write_lock:
+        new_records = [r for r in records if r['game_id'] not in shared_games]
+        if not new_records:
+            return []
+
+        client = connect_to_gsheet()
+        sheet = client.open_by_key(SHEET_ID).worksheet("games")
+        sheet.append_rows([list(r.values()) for r in new_records])
+        return shared_games.add(new_records)
+
+
+def set_games_state(games_df):
+    """Load a fresh 'games' sheet read into the shared games table."""
+    shared_games.load(games_df)
+
+
+# The shared state is re-read after this long, so manual Sheets edits and writes from other instances show up
+SHEETS_TTL_SECONDS = 300
+_sheets_read_at = None
+
+
+def load_sheets():
+    """Read all sheets into the shared games table and konsum counts."""
+    global _sheets_read_at
+    games_df, konsum_df, ledger_df = fetch_all_sheets_data()
+    set_games_state(games_df)
+    set_konsum_state(konsum_df, ledger_df)
+    _sheets_read_at = time.monotonic()
+
+
+def sheets_stale(ttl=SHEETS_TTL_SECONDS):
+    """True before the first successful read, and once the last read is older than ttl seconds."""
+    return not shared_games.loaded or _sheets_read_at is None or time.monotonic() - _sheets_read_at > ttl
+
+
+def save_games_data(games):
+    """Save new games to Sheets and the shared games table in one batch. Idempotent per game_id across all sessions."""
+    records = game_records(g for g in games if g["game_id"] not in shared_games)
+    if records:
+        append_game_rows(records)
 
 
 def save_konsum_data(konsum_updates):
     """
     konsum_updates: dict of {game_id: {player_name: {"beer": x, "water": y, "ids": [id1, id2]}}}
-    Saves all konsum updates to Google Sheets.
+    Saves manual konsum counts to the 'konsum' sheet. Supabase entries go to the ledger (save_konsum_entries).
+    Upserts by (game_id, player_name) across all sessions: existing rows are updated, never appended twice.
     """
     if not konsum_updates:
         return
 
     client = connect_to_gsheet()
     sheet = client.open_by_key(SHEET_ID).worksheet("konsum")
-    existing_konsum = st.session_state.get('konsum_df', pd.DataFrame())
-    
-    rows_to_append = []
-    updated_indices = []
-
-    for game_id, players in konsum_updates.items():
-        for player_name, counts in players.items():
-            beer = counts["beer"]
-            water = counts["water"]
-            ids = counts.get("ids", [])
-            ids_str = f"({', '.join(map(str, ids))})" if ids else ""
-
-            matching_rows = existing_konsum[
-                (existing_konsum['game_id'] == game_id) &
-                (existing_konsum['player_name'] == player_name)
-            ]
-            
-            if not matching_rows.empty:
-                row_index = matching_rows.index[0] + 2
-                updated_indices.append((row_index, beer, water, ids_str))
-                existing_konsum.loc[matching_rows.index, ['beer','water','IDs']] = [beer, water, ids_str]
-            else:
-                rows_to_append.append([game_id, player_name, beer, water, ids_str])
-                new_row = pd.DataFrame([{
-                    'game_id': game_id,
-                    'player_name': player_name,
-                    'beer': beer,
-                    'water': water,
-                    'IDs': ids_str
-                }])
-                existing_konsum = pd.concat([existing_konsum, new_row], ignore_index=True)
-
-    for row_index, beer, water, ids_str in updated_indices:
-        sheet.update(f"C{row_index}:E{row_index}", [[beer, water, ids_str]])
-
-    for row in rows_to_append:
-        sheet.append_row(row)
-
-    st.session_state['konsum_df'] = existing_konsum
-    print(f"✅ Konsum batch saved: {len(updated_indices)} updates, {len(rows_to_append)} new rows")
+
+    updated_count = 0
+    appended_count = 0
+
+    with _write_lock:
+        for game_id, players in konsum_updates.items():
+            for player_name, counts in players.items():
+                beer = counts["beer"]
+                water = counts["water"]
+                ids = counts.get("ids", [])
+                ids_str = f"({', '.join(map(str, ids))})" if ids else ""
+
+                row_index = _konsum_rows.get((game_id, player_name))
+                if row_index is not None:
+                    sheet.update(f"C{row_index}:E{row_index}", [[beer, water, ids_str]])
+                    updated_count += 1
+                else:
+                    response = sheet.append_row([game_id, player_name, beer, water, ids_str])
+                    _konsum_rows[(game_id, player_name)] = _appended_row_number(response)
+                    appended_count += 1
+                shared_konsum.set_legacy(game_id, player_key(player_name), beer, water)
+
+    print(f"✅ Konsum batch saved: {updated_count} updates, {appended_count} new rows")
+
+
+def _ledger_for_write(spreadsheet):
+    """
+    The ledger worksheet (created here, on the first write). If no ledger read has succeeded yet, its
+    entry ids and counts are loaded first, so nothing is appended twice. Call with _write_lock held.
+    """
+    global _ledger_loaded
+    sheet = get_ledger_worksheet(spreadsheet)
+    if not _ledger_loaded:
+        ledger = ledger_from_values(sheet.get_all_values())
+        _saved_entry_ids.update(ledger.index)
+        shared_konsum.add_entries(ledger)
+        _ledger_loaded = True
+    return sheet
+
+
+def append_ledger_entries(entries_df):
+    """
+    Append konsum entries to the ledger sheet, skipping entry_ids any session already saved,
+    and add them to the shared konsum counts. Does not touch session_state, so it is safe from
+    background threads. Returns the inserted rows indexed by entry_id.
+    """
+    with _write_lock:
+        sheet = None
+        if not _ledger_loaded:
+            # The saved entry ids have to be known before deciding which entries are new
+            sheet = _ledger_for_write(connect_to_gsheet().open_by_key(SHEET_ID))
+        new_entries = entries_df[~entries_df['entry_id'].isin(_saved_entry_ids)].drop_duplicates('entry_id')
+        if new_entries.empty:
+            return empty_ledger()
+        if sheet is None:
+            sheet = _ledger_for_write(connect_to_gsheet().open_by_key(SHEET_ID))
+        new_entries = new_entries.astype({"entry_id": "int64", "game_id": str})
+        if "player_key" not in new_entries.columns:
+            new_entries = new_entries.assign(player_key=player_keys(new_entries["player_name"]))
+        sheet.append_rows(new_entries[LEDGER_COLUMNS].values.tolist())
+        _saved_entry_ids.update(new_entries['entry_id'])
+
+        new_entries = new_entries[LEDGER_COLUMNS + ["player_key"]].set_index('entry_id')
+        shared_konsum.add_entries(new_entries)
+    print(f"✅ Konsum ledger: {len(new_entries)} new entries")
+    return new_entries
+
+
+def latest_entry_id():
+    """Highest Supabase entry id known to be in the ledger (0 if none)."""
+    with _write_lock:
+        return max(_saved_entry_ids, default=0)
+
+
+def write_state_sizes():
+    """Bytes held by the process-wide write bookkeeping, for the debug view."""
+    with _write_lock:
+        return {
+            "games table": deep_sizeof(shared_games.rows) + deep_sizeof(shared_games.ids),
+            "saved entry ids": deep_sizeof(_saved_entry_ids),
+            "konsum sheet rows": deep_sizeof(_konsum_rows),
+            "konsum counts": deep_sizeof([shared_konsum.legacy, shared_konsum.ledger, shared_konsum.players]),
+        }
+
+
+def save_konsum_entries(entries_df):
+    """
+    Insert Supabase konsum entries into the ledger, one row per entry_id.
+    Entries already in the ledger (this session's or any other session's writes) are skipped,
+    so re-syncing is a no-op. entries_df columns: entry_id, game_id, player_name, drink_type (player_key optional).
+    Only the inserted entries are added to the shared counts. Returns the number inserted.
+    """
+    return len(append_ledger_entries(entries_df))
 
 
 def fetch_games_within_last_48_hours(days=2):
     try:
-        games_df = st.session_state.get('games_df', pd.DataFrame())
+        games_df = shared_games.frame()
         if games_df.empty:
             return []
 
-        games_df['game_finished_at'] = pd.to_datetime(games_df['game_finished_at'], errors='coerce')
+        # Dates and scores are typed once in the shared table
         cutoff = datetime.utcnow() - timedelta(days=days)
-        filtered = games_df[games_df['game_finished_at'] >= cutoff].copy()
-        filtered['score_team1'] = filtered['score_team1'].astype(int)
-        filtered['score_team2'] = filtered['score_team2'].astype(int)
-        return filtered.to_dict(orient='records')
+        return games_df[games_df['game_finished_at'] >= cutoff].to_dict(orient='records')
     except:
         return []
 
 
 def fetch_konsum_data_for_game(game_id):
-    """Fetch konsum data for a game, including IDs for duplicate prevention."""
-    konsum_df = st.session_state.get('konsum_df', pd.DataFrame())
-    if konsum_df.empty:
-        return {}
-
-    game_konsum = konsum_df[konsum_df['game_id'] == game_id]
-    konsum_data = {}
-
-    for _, row in game_konsum.iterrows():
-        player_name = row['player_name']
-        beer = int(row['beer']) if str(row['beer']).isdigit() else 0
-        water = int(row['water']) if str(row['water']).isdigit() else 0
-        ids_str = str(row.get('IDs',''))
-        if ids_str.startswith("(") and ids_str.endswith(")"):
-            ids_list = [int(x.strip()) for x in ids_str[1:-1].split(",") if x.strip().isdigit()]
-        else:
-            ids_list = []
-
-        konsum_data[player_name] = {'beer': beer, 'water': water, 'ids': ids_list}
-
-    return konsum_data
+    """Fetch beer/water counts per player_key for a game."""
+    return shared_konsum.for_game(game_id)
@@ -0,0 +1,50 @@
+from io import BytesIO
+import pandas as pd
+import pyarrow as pa
+
+# Download formats: label -> (file extension, mime type)
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet (zstd)": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+# Dates in CSV exports keep the format the CSV downloads have always used
+CSV_DATE_FORMAT = "%Y-%m-%d %H:%M"
+
+
+def filter_export(df, columns=None, start=None, end=None, date_column="Date"):
+    """Rows with date_column in [start, end] (inclusive, whole days) and only the selected columns (None: all)."""
+    if date_column in df.columns and (start is not None or end is not None):
+        dates = pd.to_datetime(df[date_column], errors="coerce")
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= dates < pd.Timestamp(end) + pd.Timedelta(days=1)
+        df = df[mask]
+    if columns is not None:
+        df = df[[c for c in df.columns if c in set(columns)]]
+    return df.reset_index(drop=True)
+
+
+def export_bytes(df, fmt):
+    """Serialize df as CSV, zstd-compressed Parquet or Arrow IPC (file format, zstd-compressed buffers)."""
+    if fmt == "CSV":
+        return df.to_csv(index=False, date_format=CSV_DATE_FORMAT).encode("utf-8")
+
+    buffer = BytesIO()
+    if fmt == "Parquet (zstd)":
+        df.to_parquet(buffer, engine="pyarrow", compression="zstd", index=False)
+    elif fmt == "Arrow IPC":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(buffer, table.schema, options=options) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return buffer.getvalue()
+
+
+def export_file_name(stem, fmt):
+    return f"{stem}.{EXPORT_FORMATS[fmt][0]}"
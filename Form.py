@@ -0,0 +1,90 @@
+import threading
+import pandas as pd
+from Stats import STAT_MAP
+
+# Metrics with a rolling "form" series
+FORM_METRICS = list(STAT_MAP.keys()) + ["Beer", "Water"]
+FORM_WINDOWS = (3, 5, 10, 20)
+
+
+def rolling_form(rows, window):
+    """Rolling N-game mean of every FORM_METRICS column per player. rows must be sorted by Date."""
+    # Roll on positions, so repeated index labels cannot break the realignment
+    positional = rows.reset_index(drop=True)
+    rolled = positional.groupby("player_key", sort=False)[FORM_METRICS].rolling(window, min_periods=1).mean()
+    rolled = rolled.reset_index(level=0, drop=True).sort_index()
+    rolled.index = rows.index
+    return rolled
+
+
+class FormCache:
+    """
+    Rolling form series over the typed per-game stats table, cached by (player, metric, window).
+    update() only recomputes each player's rows from their first new or changed game onwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = pd.DataFrame()
+        self.game_versions = {}
+        self.windows = {}
+        self.series_cache = {}
+
+    def stale_games(self, versions):
+        """game_ids that are new or whose konsum changed since their rows were built."""
+        return [game_id for game_id, version in versions.items() if self.game_versions.get(game_id) != version]
+
+    def update(self, new_rows, versions):
+        """Replace the rows of the games in versions with new_rows (columns: game_id, Date, player_key, Player, FORM_METRICS)."""
+        with self._lock:
+            changed = set(versions)
+            if not new_rows.empty:
+                new_rows = new_rows.astype({metric: "float64" for metric in FORM_METRICS})
+            in_changed = self.rows["game_id"].isin(changed) if not self.rows.empty else pd.Series(dtype=bool)
+            kept = self.rows[~in_changed] if not self.rows.empty else self.rows
+            # Players no longer in a changed game are rebuilt from their first game
+            removed = self.rows[in_changed] if not self.rows.empty else self.rows
+            new_pairs = set(zip(new_rows["game_id"], new_rows["player_key"])) if not new_rows.empty else set()
+            left = {key for game_id, key in zip(removed.get("game_id", ()), removed.get("player_key", ()))
+                    if (game_id, key) not in new_pairs}
+            self.game_versions.update(versions)
+            frames = [frame for frame in (kept, new_rows) if not frame.empty]
+            if not frames:
+                self.rows, self.windows, self.series_cache = pd.DataFrame(), {}, {}
+                return
+            # One row per (game, player): a game saved twice or a player under two aliases counts once
+            rows = pd.concat(frames).drop_duplicates(["game_id", "player_key"])
+            rows = rows.sort_values(["Date", "game_id"], kind="stable")
+            rows.index = pd.MultiIndex.from_arrays([rows["game_id"], rows["player_key"]], names=[None, None])
+
+            # --- Everything from each player's first changed game onwards is recomputed ---
+            pos = rows.groupby("player_key").cumcount()
+            first = pos.where(rows["game_id"].isin(changed)).groupby(rows["player_key"]).transform("min")
+            first = first.mask(rows["player_key"].isin(left), 0)
+            recompute = pos >= first
+            for window, old in self.windows.items():
+                block = rows[pos >= first - (window - 1)]
+                fresh = rolling_form(block, window)[recompute[block.index]]
+                kept_values = old.reindex(rows.index[~recompute.to_numpy()])
+                self.windows[window] = pd.concat([kept_values, fresh]).reindex(rows.index)
+
+            changed_players = set(rows.loc[recompute.to_numpy(), "player_key"]) | left
+            self.series_cache = {k: v for k, v in self.series_cache.items() if k[0] not in changed_players}
+            self.rows = rows
+
+    def series(self, player_key, metric, window):
+        """Rolling mean of metric over the last `window` games of a player, indexed by game date."""
+        key = (player_key, metric, window)
+        with self._lock:
+            cached = self.series_cache.get(key)
+            if cached is not None:
+                return cached
+            if self.rows.empty:
+                return pd.Series(dtype="float64")
+            if window not in self.windows:
+                self.windows[window] = rolling_form(self.rows, window)
+            mask = (self.rows["player_key"] == player_key).to_numpy()
+            cached = pd.Series(self.windows[window].loc[mask, metric].to_numpy(),
+                               index=self.rows.loc[mask, "Date"].to_numpy(), name=metric)
+            self.series_cache[key] = cached
+            return cached
@@ -0,0 +1,152 @@
+import pandas as pd
+import streamlit as st
+from supabase import create_client
+from Players import UNKNOWN_PLAYER, canonical_names, player_keys
+from Snapshot import recorded, replayed
+
+_supabase = None
+
+
+def get_supabase():
+    """Supabase client, created on first use so the mapping helpers work without secrets."""
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
+    return _supabase
+
+
+def entries_frame(rows):
+    """Supabase 'entries' rows -> DataFrame with UTC 'datetime' and 'player_name' columns."""
+    df = pd.DataFrame(rows)
+    if df.empty:
+        return df
+
+    # Ensure datetime column is parsed correctly
+    if 'datetime' in df.columns:
+        df['datetime'] = pd.to_datetime(df['datetime'], utc=True, errors='coerce')
+    else:
+        print("⚠️ No 'datetime' column found in Supabase data")
+        df['datetime'] = pd.NaT
+
+    # Keep the original name column for mapping later if needed
+    df.rename(columns={'name': 'player_name'}, inplace=True)
+    return df
+
+
+@recorded("fetch_supabase_konsum_data")
+def read_supabase_entries():
+    """All rows of the Supabase 'entries' table. Raises on Supabase errors."""
+    response = get_supabase().table("entries").select("*").execute()
+    print("📝 Raw Supabase response:", response)
+    return response.data
+
+
+def fetch_supabase_konsum_data():
+    """Fetch all player consumption data from Supabase without filtering by allowed players."""
+    try:
+        rows = read_supabase_entries()
+        if not rows:
+            print("⚠️ No consumption data found in Supabase.")
+            return pd.DataFrame()
+
+        df = entries_frame(rows)
+        print(f"Columns in Supabase data: {df.columns}")
+        print("Sample rows:\n", df.head())
+
+        print(f"✅ Retrieved {len(df)} konsum entries from Supabase")
+        return df
+
+    except Exception as e:
+        print(f"⚠️ Supabase fetch error: {e}")
+        return pd.DataFrame()
+
+
+def replay_entries_since(last_id, limit=500):
+    """Offline: serve new entries from the recorded 'entries' table."""
+    rows = replayed("fetch_supabase_konsum_data") or []
+    rows = sorted((r for r in rows if r.get("id", 0) > last_id), key=lambda r: r["id"])
+    return entries_frame(rows[:limit])
+
+
+@recorded("fetch_supabase_entries_since", replay=replay_entries_since, record=False)
+def fetch_supabase_entries_since(last_id, limit=500):
+    """Only the entries with id > last_id, oldest first. Cost depends on the new rows, not the table size."""
+    try:
+        response = get_supabase().table("entries").select("*").gt("id", last_id).order("id").limit(limit).execute()
+        return entries_frame(response.data or [])
+    except Exception as e:
+        print(f"⚠️ Supabase fetch error: {e}")
+        return pd.DataFrame()
+
+
+def map_drink(x):
+    """Normalize a Supabase 'bgdata' value to 'beer', 'water' or None."""
+    if isinstance(x, str):
+        x = x.lower()
+        if "beer" in x: return "beer"
+        if "vann" in x: return "water"
+    return None
+
+
+def assign_konsum_to_games(konsum_df, games_df, hours_window=24):
+    """
+    Assign each Supabase konsum entry to the closest previous game.
+    Entries with no previous game, or more than hours_window after it, are dropped.
+    Returns (assigned_df, skipped_count). No Streamlit or Sheets access.
+    """
+    if konsum_df.empty or games_df.empty:
+        return pd.DataFrame(), 0
+
+    # --- Clean and prepare games data ---
+    games = games_df[['game_id', 'game_finished_at']].copy()
+    # merge_asof needs both keys in the same resolution
+    games['game_finished_at'] = pd.to_datetime(games['game_finished_at'], utc=True, errors='coerce').astype('datetime64[ns, UTC]')
+    games = games.dropna(subset=['game_finished_at']).sort_values('game_finished_at')
+
+    # --- Clean konsum data ---
+    konsum = konsum_df.copy()
+    konsum['datetime'] = pd.to_datetime(konsum['datetime'], utc=True, errors='coerce').astype('datetime64[ns, UTC]')
+    konsum['drink_type'] = konsum['bgdata'].map(map_drink)
+    konsum = konsum.dropna(subset=['datetime', 'drink_type', 'id'])
+
+    # --- Map player names through the player dimension, but keep all if not mapped ---
+    konsum['player_name_mapped'] = canonical_names(konsum['player_name'])
+    konsum = konsum[konsum['player_name_mapped'].astype(bool)]
+
+    # --- Closest previous game within the window, in one sorted pass ---
+    assigned = pd.merge_asof(
+        konsum.sort_values('datetime'), games,
+        left_on='datetime', right_on='game_finished_at',
+        direction='backward', tolerance=pd.Timedelta(hours=hours_window)
+    )
+    skipped_count = int(assigned['game_id'].isna().sum())
+    assigned = assigned.dropna(subset=['game_id'])
+    return assigned, skipped_count
+
+
+def ledger_entries(assigned):
+    """Assigned entries -> konsum ledger rows (entry_id, game_id, player_name, drink_type, player_key)."""
+    return pd.DataFrame({
+        'entry_id': assigned['id'].astype('int64'),
+        'game_id': assigned['game_id'].astype(str),
+        'player_name': assigned['player_name_mapped'],
+        'drink_type': assigned['drink_type'],
+        'player_key': player_keys(assigned['player_name_mapped']),
+    })
+
+
+def konsum_data_for_game(game_id, konsum_df):
+    """{player_key: {'beer', 'water'}} for one game, from konsum_counts() rows."""
+    try:
+        if konsum_df.empty:
+            return {}
+
+        game_konsum = konsum_df[konsum_df['game_id'] == str(game_id)]
+        return {
+            int(key): {'beer': int(beer), 'water': int(water)}
+            for key, beer, water in zip(game_konsum['player_key'], game_konsum['beer'], game_konsum['water'])
+            if key != UNKNOWN_PLAYER
+        }
+    except Exception as e:
+        print(f"⚠️ Error processing konsum data for {game_id}: {e}")
+        return {}
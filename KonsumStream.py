@@ -0,0 +1,149 @@
+import bisect
+import threading
+import time
+import pandas as pd
+from Konsum import assign_konsum_to_games, entries_frame, ledger_entries
+
+
+class LocalEntries:
+    """In-memory stand-in for the Supabase 'entries' table, to run the ingestion loop without Supabase."""
+
+    def __init__(self, rows=()):
+        self._lock = threading.Lock()
+        self._ids = []
+        self._rows = []
+        for row in rows:
+            self.insert(**row)
+
+    def insert(self, name, bgdata, datetime=None, id=None):
+        with self._lock:
+            entry_id = id if id is not None else (self._ids[-1] + 1 if self._ids else 1)
+            row = {
+                "id": entry_id, "name": name, "bgdata": bgdata,
+                "datetime": datetime or pd.Timestamp.now(tz="UTC").isoformat(),
+            }
+            pos = bisect.bisect(self._ids, entry_id)
+            self._ids.insert(pos, entry_id)
+            self._rows.insert(pos, row)
+            return entry_id
+
+    def fetch_since(self, last_id, limit=500):
+        with self._lock:
+            start = bisect.bisect_right(self._ids, last_id)
+            rows = self._rows[start:start + limit]
+        return entries_frame(rows)
+
+
+class KonsumIngestor:
+    """
+    Background loop that keeps the konsum ledger close to real time.
+    Each tick only fetches entries with id > the last seen id, maps them to games with the
+    closest-previous-game rule and saves just those rows, so the cost per tick does not grow with history.
+
+    fetch_since(last_id) -> DataFrame of new entries (Supabase or LocalEntries).
+    save_entries(entries_df) -> inserted rows; entries_df has the konsum ledger columns.
+    refresh_games(games_df) -> games_df, optional. When set, entries logged after the last
+    games check wait until the next check, since they may belong to a game not fetched yet.
+    idle_after: seconds without touch() after which the loop stops polling until the next touch() (None: never idle).
+    """
+
+    def __init__(self, fetch_since, save_entries, games_df=None, refresh_games=None,
+                 interval=5.0, games_interval=30.0, hours_window=24, last_id=0, idle_after=None):
+        self.fetch_since = fetch_since
+        self.save_entries = save_entries
+        self.refresh_games = refresh_games
+        self.interval = interval
+        self.games_interval = pd.Timedelta(seconds=games_interval)
+        self.hours_window = hours_window
+        self.last_id = last_id
+        self.games_df = games_df if games_df is not None else pd.DataFrame()
+        self.games_checked_at = None
+        self.pending = pd.DataFrame()
+        self.ticks = 0
+        self.saved_total = 0
+        self.idle_after = idle_after
+        self.last_active = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def set_games(self, games_df):
+        with self._lock:
+            self.games_df = games_df
+
+    def touch(self):
+        """Someone is using the app: keep polling, and wake the loop if it is idle."""
+        self.last_active = time.monotonic()
+        self._wake.set()
+
+    def idle(self):
+        return self.idle_after is not None and time.monotonic() - self.last_active > self.idle_after
+
+    def tick(self, now=None):
+        """One poll: fetch new entries, map the ones that are ready, save them. Returns rows saved."""
+        now = now or pd.Timestamp.now(tz="UTC")
+        with self._lock:
+            self.ticks += 1
+            if self.refresh_games and (self.games_checked_at is None or now - self.games_checked_at >= self.games_interval):
+                self.games_df = self.refresh_games(self.games_df)
+                self.games_checked_at = now
+
+            new = self.fetch_since(self.last_id)
+            if not new.empty:
+                self.last_id = max(self.last_id, int(new['id'].max()))
+                new = new.dropna(subset=['datetime'])
+                self.pending = pd.concat([self.pending, new], ignore_index=True) if not self.pending.empty else new
+            if self.pending.empty:
+                return 0
+
+            # --- Only entries the current game list can place correctly ---
+            if self.refresh_games:
+                ready = self.pending['datetime'] <= self.games_checked_at
+            else:
+                ready = pd.Series(True, index=self.pending.index)
+            batch = self.pending[ready]
+            self.pending = self.pending[~ready].reset_index(drop=True)
+            if batch.empty:
+                return 0
+
+            assigned, _ = assign_konsum_to_games(batch, self.games_df, self.hours_window)
+            if assigned.empty:
+                return 0
+
+            entries = ledger_entries(assigned)
+            try:
+                saved = len(self.save_entries(entries))
+            except Exception:
+                # Retry the whole batch next tick; the ledger skips ids that did get saved
+                self.pending = pd.concat([batch, self.pending], ignore_index=True)
+                raise
+            self.saved_total += saved
+            return saved
+
+    def _run(self):
+        while not self._stop.is_set():
+            if self.idle():
+                # Nobody is using the app: sleep until touch() or stop() instead of polling
+                self._wake.clear()
+                if self.idle():
+                    self._wake.wait()
+                continue
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"⚠️ Konsum ingestion error: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="konsum-ingestor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
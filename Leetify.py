@@ -0,0 +1,206 @@
+import gzip
+import json
+import os
+import requests
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from Memory import game_cache
+from Players import resolve_player_stats
+from Snapshot import recorded, replayed, store
+
+# API Endpoints
+PROFILE_API = "https://api.cs-prod.leetify.com/api/profile/id/"
+GAMES_API = "https://api.cs-prod.leetify.com/api/games/"
+HISTORY_API = "https://api.cs-prod.leetify.com/api/v2/games/history"
+
+# The only per-player fields the app reads (STAT_MAP + Home page) and their types; everything else is dropped
+PLAYER_FIELDS = {
+    "kdRatio": float, "dpr": float, "hltvRating": float, "reactionTime": float,
+    "tradeKillAttemptsPercentage": float, "flashbangThrown": int, "multi2k": int, "multi3k": int,
+    "utilityOnDeathAvg": float,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class PlayerRecord:
+    """
+    One allowed player in a projected game. Fixed fields, counts stay ints.
+    team is Leetify's initialTeamNumber (0 if missing); result is that team's 'win', 'loss' or 'tie' ('' if unknown).
+    """
+    name: str
+    player_key: int
+    team: int
+    result: str
+    kdRatio: float
+    dpr: float
+    hltvRating: float
+    reactionTime: float
+    tradeKillAttemptsPercentage: float
+    flashbangThrown: int
+    multi2k: int
+    multi3k: int
+    utilityOnDeathAvg: float
+
+# Set LEETIFY_ARCHIVE_DIR to keep a gzip copy of every raw game payload
+ARCHIVE_DIR = os.environ.get("LEETIFY_ARCHIVE_DIR")
+
+# Finished games never change, so projected games are cached process-wide (LRU, bounded by the memory budget)
+_game_cache = game_cache
+
+
+def profile_key(token, start_date, end_date, count=30):
+    """Snapshot key of a history request: the window length in days, not the (moving) dates."""
+    return round((end_date - start_date) / timedelta(days=1)), count
+
+
+def replay_profile(token, start_date, end_date, count=30):
+    """Offline: the recorded history for this window length, else the longest one recorded."""
+    key = profile_key(token, start_date, end_date, count)
+    keys = store.keys("fetch_profile")
+    if key not in keys and keys:
+        key = max(keys)
+    return replayed("fetch_profile", key)
+
+
+@recorded("fetch_profile", key=profile_key, replay=replay_profile)
+def fetch_profile(token, start_date, end_date, count=30):
+    print("📡 fetch_profile() called!")
+    headers = {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+    filters = {
+        "currentPeriod": {
+            "start": start_date.isoformat() + "Z",
+            "end": end_date.isoformat() + "Z",
+            "count": count
+        },
+        "previousPeriod": {
+            "start": (start_date - timedelta(days=30)).isoformat() + "Z",
+            "end": start_date.isoformat() + "Z",
+            "count": count
+        }
+    }
+
+    try:
+        response = requests.get(HISTORY_API, headers=headers, params={"filters": json.dumps(filters)})
+        response.raise_for_status()
+        data = response.json()
+
+        return data
+    except requests.RequestException as e:
+        print(f"Failed fetching profile: {e}")
+        return None
+
+def games_from_profile(profile_data, existing_game_ids, days, now=None):
+    """New games (not in existing_game_ids) finished within the last `days` days of a history response."""
+    new_games = []
+    now = now or datetime.utcnow()
+
+    for game in profile_data.get("games", []):
+        game_id = game.get("id")
+        if not game_id or game_id in existing_game_ids or game_id in {g["game_id"] for g in new_games}:
+            continue
+
+        try:
+            finished_at = datetime.strptime(game["finishedAt"], "%Y-%m-%dT%H:%M:%S.%fZ") + timedelta(hours=1)
+            if finished_at > now - timedelta(days=days):
+                finished_at_str = finished_at.strftime("%Y-%m-%d %H:%M:%S")
+                score = game.get("score", [0, 0])
+                match_result = game.get("playerStats", {}).get("matchResult", "Unknown")
+
+                new_game = {
+                    "game_id": game_id,
+                    "map_name": game.get("mapName", "Unknown"),
+                    "match_result": match_result,
+                    "scores": score,
+                    "game_finished_at": finished_at_str
+                }
+                new_games.append(new_game)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Skipping game {game_id} due to error: {e}")
+            continue
+
+    return new_games
+
+
+# Recorded below the projected-game cache, so replay keeps the live caching and projection
+@recorded("fetch_raw_game_details", key=lambda game_id: game_id, once=True)
+def fetch_raw_game_details(game_id):
+    try:
+        response = requests.get(GAMES_API + game_id, timeout=10)
+        response.raise_for_status()
+        return response.json()
+    except requests.RequestException:
+        return None
+
+
+def _number(value, kind=float):
+    """value as kind (float or int), 0 if missing or not a number."""
+    try:
+        number = float(value) if value is not None else 0.0
+        return int(round(number)) if kind is int else number
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+def team_results(details):
+    """{team number: 'win' | 'loss' | 'tie'} from the payload's teamScores, empty unless both teams are there."""
+    scores = {
+        _number(t.get("teamNumber"), int): _number(t.get("score"), int)
+        for t in details.get("teamScores", []) or [] if isinstance(t, dict)
+    }
+    if len(scores) != 2:
+        return {}
+    (team_a, score_a), (team_b, score_b) = scores.items()
+    if score_a == score_b:
+        return {team_a: "tie", team_b: "tie"}
+    return {team_a: "win" if score_a > score_b else "loss", team_b: "win" if score_b > score_a else "loss"}
+
+
+def project_game(details):
+    """
+    Project a full Leetify game payload down to {"playerStats": [PlayerRecord, ...]}.
+    Aliases are resolved here, once per game: only allowed players are kept, with canonical name and player_key.
+    Each player keeps their own team and its result, since a lobby can have friends on both sides.
+    """
+    results = team_results(details)
+    records = []
+    for p in resolve_player_stats(details.get("playerStats", []) or []):
+        team = _number(p.get("initialTeamNumber"), int)
+        records.append(PlayerRecord(
+            p["name"], p["player_key"], team, results.get(team, ""),
+            *(_number(p.get(field), kind) for field, kind in PLAYER_FIELDS.items())
+        ))
+    return {"playerStats": records}
+
+
+def archive_game(game_id, details, archive_dir=None):
+    """Write the raw payload to <archive_dir>/<game_id>.json.gz (skipped if already archived)."""
+    archive_dir = archive_dir or ARCHIVE_DIR
+    if not archive_dir:
+        return
+    path = os.path.join(archive_dir, f"{game_id}.json.gz")
+    if os.path.exists(path):
+        return
+    try:
+        os.makedirs(archive_dir, exist_ok=True)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(details, f, separators=(",", ":"))
+    except OSError as e:
+        print(f"⚠️ Could not archive game {game_id}: {e}")
+
+
+def fetch_game_details(game_id):
+    """Projected game details, fetched once per process and cached."""
+    cached = _game_cache.get(game_id)
+    if cached is not None:
+        return cached
+
+    details = fetch_raw_game_details(game_id)
+    if details is None:
+        return None
+
+    archive_game(game_id, details)
+    return _game_cache.put(game_id, project_game(details))
@@ -0,0 +1,148 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Memory budget for the process-wide caches (Leetify games + per-session derived data)
+MEMORY_BUDGET_MB = int(os.environ.get("BUBBE_MEMORY_BUDGET_MB", "256"))
+
+
+def deep_sizeof(obj, _seen=None):
+    """Approximate bytes held by obj, following DataFrames, dicts, lists, tuples, sets and __slots__ records."""
+    _seen = _seen if _seen is not None else set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True, index=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, AppendBuffer):
+        return obj.nbytes()
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(v, _seen) for v in obj)
+    elif hasattr(type(obj), "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, slot), _seen) for slot in type(obj).__slots__ if hasattr(obj, slot))
+    return size
+
+
+class LRUCache:
+    """Thread-safe cache bounded by total bytes; the least recently used entries are evicted first."""
+
+    def __init__(self, budget_bytes, sizeof=deep_sizeof):
+        self.budget_bytes = budget_bytes
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.budget_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_build(self, key, build):
+        value = self.get(key)
+        if value is None:
+            value = build()
+            if value is not None:
+                self.put(key, value)
+        return value
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries), "MB": round(self.bytes / 2**20, 2),
+                "budget MB": round(self.budget_bytes / 2**20, 2),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+            }
+
+
+class AppendBuffer:
+    """
+    Append-only table of numpy columns. Capacity doubles when full, so appending k rows costs amortized
+    O(k) instead of copying the whole table like pd.concat. Filled rows are never written again, so the
+    frames from frame() stay valid (and unchanged) after later appends.
+    """
+
+    def __init__(self, dtypes, capacity=64):
+        self.dtypes = dict(dtypes)
+        self.size = 0
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self.dtypes.items()}
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(next(iter(self._columns.values())))
+
+    def append(self, rows):
+        """Append a DataFrame (or dict of equal-length columns) holding at least the buffer's columns."""
+        n = len(rows[next(iter(self.dtypes))])
+        if self.size + n > self.capacity:
+            capacity = max(2 * self.capacity, self.size + n)
+            for name, column in self._columns.items():
+                grown = np.empty(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                self._columns[name] = grown
+        for name, column in self._columns.items():
+            column[self.size:self.size + n] = np.asarray(rows[name], dtype=column.dtype)
+        self.size += n
+
+    def frame(self):
+        """The filled rows as a DataFrame over the buffer's arrays."""
+        return pd.DataFrame({name: column[:self.size] for name, column in self._columns.items()}, copy=False)
+
+    def nbytes(self):
+        """Bytes held, including unused capacity and the objects in object columns."""
+        size = sum(column.nbytes for column in self._columns.values())
+        for column in self._columns.values():
+            if column.dtype == object:
+                size += sum(sys.getsizeof(v) for v in column[:self.size])
+        return size
+
+
+# Half the budget for projected Leetify games, half for per-session derived data
+game_cache = LRUCache(MEMORY_BUDGET_MB * 2**20 // 2)
+session_cache = LRUCache(MEMORY_BUDGET_MB * 2**20 // 2)
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (None where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
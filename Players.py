@@ -0,0 +1,82 @@
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# Player Name Mapping (raw Leetify/Supabase name -> canonical name)
+NAME_MAPPING = {
+    "JimmyJimbob": "Jepprizz", "Jimmy": "Jepprizz", "Kåre": "Torgrizz", "Kaare": "Torgrizz",
+    "Fakeface": "Birkle", "Killthem26": "Birkle", "Killbirk": "Birkle", "Lars Olaf": "Tobrizz", "tobbelobben": "Tobrizz",
+    "Bøghild": "Borgle", "Nish": "Sandrizz", "Nishinosan": "Sandrizz", "Zohan": "Jorizz", "johlyn": "Jorizz"
+}
+ALLOWED_PLAYERS = set(NAME_MAPPING.values())
+
+# Key used for names that are not in the player dimension
+UNKNOWN_PLAYER = -1
+
+# Norwegian letters that do not decompose with NFKD
+_TRANSLITERATE = str.maketrans({"å": "aa", "ø": "oe", "æ": "ae"})
+
+
+def normalize_alias(name):
+    """Fold case and diacritics so 'Kåre', 'KAARE' and 'kaare' compare equal."""
+    if not isinstance(name, str):
+        return ""
+    folded = name.strip().casefold().translate(_TRANSLITERATE)
+    folded = unicodedata.normalize("NFKD", folded)
+    return "".join(c for c in folded if not unicodedata.combining(c))
+
+
+# --- Player dimension: one row per canonical player with a compact integer key ---
+PLAYER_NAMES = np.array(sorted(ALLOWED_PLAYERS), dtype=object)
+PLAYER_KEYS = {name: key for key, name in enumerate(PLAYER_NAMES)}
+
+ALIAS_TO_KEY = {normalize_alias(name): key for name, key in PLAYER_KEYS.items()}
+for alias, name in NAME_MAPPING.items():
+    ALIAS_TO_KEY[normalize_alias(alias)] = PLAYER_KEYS[name]
+
+PLAYER_DIM = pd.DataFrame({
+    "player_key": np.arange(len(PLAYER_NAMES), dtype=np.int16),
+    "player_name": PLAYER_NAMES,
+    "aliases": [sorted(a for a, k in ALIAS_TO_KEY.items() if k == key) for key in range(len(PLAYER_NAMES))],
+})
+
+
+def player_key(name):
+    """Integer key for a single raw name, UNKNOWN_PLAYER if not in the dimension."""
+    return ALIAS_TO_KEY.get(normalize_alias(name), UNKNOWN_PLAYER)
+
+
+def player_keys(names):
+    """
+    Vectorized alias resolution for a Series/array of raw names.
+    Each distinct name is normalized once, then codes are mapped back with one take().
+    """
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=True)
+    unique_keys = np.fromiter((player_key(u) for u in uniques), dtype=np.int16, count=len(uniques))
+    # Append UNKNOWN_PLAYER so the NA sentinel (-1) lands on it
+    unique_keys = np.append(unique_keys, np.int16(UNKNOWN_PLAYER))
+    return unique_keys[codes]
+
+
+def canonical_names(names):
+    """Vectorized NAME_MAPPING.get(name, name): canonical name where known, raw name otherwise."""
+    names = pd.Series(names, dtype=object)
+    keys = player_keys(names)
+    known = keys != UNKNOWN_PLAYER
+    out = names.to_numpy(copy=True)
+    out[known] = PLAYER_NAMES[keys[known]]
+    return pd.Series(out, index=names.index, dtype=object)
+
+
+def resolve_player_stats(player_stats):
+    """
+    Resolve the 'playerStats' list of a Leetify game once per record.
+    Returns only allowed players, each with canonical 'name' and integer 'player_key'.
+    """
+    if not player_stats:
+        return []
+    keys = player_keys([p.get("name") for p in player_stats])
+    return [
+        {**p, "name": PLAYER_NAMES[key], "player_key": int(key)}
+        for p, key in zip(player_stats, keys) if key != UNKNOWN_PLAYER
+    ]
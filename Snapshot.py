@@ -0,0 +1,263 @@
+"""
+Record/replay of the external backends, so the app can run offline with reproducible data and timing.
+
+    BUBBE_SNAPSHOT=record streamlit run streamlit_app.py   # use the real backends, save every response
+    BUBBE_SNAPSHOT=replay streamlit run streamlit_app.py   # serve saved responses, no network at all
+    python Snapshot.py --days 15                           # record a full snapshot headlessly
+
+BUBBE_SNAPSHOT_PATH    snapshot file (default snapshots/bubbe.pkl.gz, gzip-compressed pickle; only load your own)
+BUBBE_SNAPSHOT_LATENCY replay delay per call: seconds, or 'recorded' to replay the measured call durations
+BUBBE_SNAPSHOT_SHIFT   '1' (default) moves replayed timestamps forward by whole days since recording,
+                       so 'last N days' windows show the same games as when the snapshot was taken
+"""
+import argparse
+import atexit
+import copy
+import functools
+import gzip
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+
+MODE = os.environ.get("BUBBE_SNAPSHOT") or None  # None, "record" or "replay"
+SNAPSHOT_PATH = os.environ.get("BUBBE_SNAPSHOT_PATH", os.path.join("snapshots", "bubbe.pkl.gz"))
+LATENCY = os.environ.get("BUBBE_SNAPSHOT_LATENCY", "0")
+TIME_SHIFT = os.environ.get("BUBBE_SNAPSHOT_SHIFT", "1") == "1"
+
+# While recording, the file is rewritten at most this often; later responses are flushed by a timer and at exit
+SAVE_INTERVAL_SECONDS = 2.0
+
+
+def snapshot_mode():
+    return MODE
+
+
+class SnapshotStore:
+    """Recorded call results: name -> {key: (value, seconds)}, plus when they were recorded."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.recorded_at = None
+        self._loaded = False
+        self._saved_at = 0.0
+        self._dirty = False
+        self._timer = None
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return self
+            self._loaded = True
+            if os.path.exists(self.path):
+                with gzip.open(self.path, "rb") as f:
+                    data = pickle.load(f)
+                self.calls, self.recorded_at = data["calls"], data["recorded_at"]
+                print(f"📼 Loaded snapshot {self.path} ({sum(len(v) for v in self.calls.values())} responses)")
+            elif MODE == "replay":
+                print(f"⚠️ No snapshot at {self.path}, every backend call will come back empty")
+        return self
+
+    def record(self, name, key, value, seconds):
+        self.load()
+        with self._lock:
+            self.calls.setdefault(name, {})[key] = (copy.deepcopy(value), seconds)
+            self.recorded_at = datetime.utcnow()
+            self._dirty = True
+            due = time.monotonic() - self._saved_at > SAVE_INTERVAL_SECONDS
+        if due:
+            self.save()
+        else:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        with self._lock:
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(SAVE_INTERVAL_SECONDS, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Save if anything was recorded since the last save (run by the timer and at exit)."""
+        with self._lock:
+            self._timer = None
+            dirty = self._dirty
+        if dirty:
+            self.save()
+
+    def lookup(self, name, key):
+        self.load()
+        with self._lock:
+            return self.calls.get(name, {}).get(key)
+
+    def keys(self, name):
+        self.load()
+        with self._lock:
+            return list(self.calls.get(name, {}))
+
+    def save(self):
+        with self._lock:
+            data = {"calls": self.calls, "recorded_at": self.recorded_at}
+            self._saved_at = time.monotonic()
+            self._dirty = False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+
+
+store = SnapshotStore(SNAPSHOT_PATH)
+# Responses recorded within SAVE_INTERVAL_SECONDS of the last save would otherwise be lost at shutdown
+atexit.register(lambda: store.flush())
+
+
+# --- Replay helpers ---
+
+def _shift_delta():
+    if not TIME_SHIFT or store.recorded_at is None:
+        return timedelta(0)
+    return timedelta(days=(datetime.utcnow() - store.recorded_at).days)
+
+
+def _shift_strings(values, fmt, delta):
+    parsed = pd.to_datetime(values, format=fmt, errors="coerce")
+    return pd.Series(parsed + delta).dt.strftime(fmt).where(parsed.notna(), values)
+
+
+def _shift(name, value, delta):
+    """Move the timestamps in a recorded response forward by delta."""
+    if not delta or value is None:
+        return value
+    if name == "fetch_all_sheets_data":
+        games_df, konsum_df, ledger_df = value
+        if not games_df.empty:
+            games_df["game_finished_at"] = _shift_strings(games_df["game_finished_at"], "%Y-%m-%d %H:%M:%S", delta).to_numpy()
+        return games_df, konsum_df, ledger_df
+    if name == "fetch_profile":
+        for game in value.get("games", []):
+            shifted = _shift_strings(pd.Series([game.get("finishedAt")]), "%Y-%m-%dT%H:%M:%S.%fZ", delta)
+            game["finishedAt"] = shifted.iloc[0]
+        return value
+    if name == "fetch_supabase_konsum_data":
+        for row in value:
+            moved = pd.to_datetime(row.get("datetime"), utc=True, errors="coerce")
+            if pd.notna(moved):
+                row["datetime"] = (moved + delta).isoformat()
+    return value
+
+
+def _sleep(seconds):
+    if LATENCY == "recorded":
+        time.sleep(seconds)
+    elif float(LATENCY) > 0:
+        time.sleep(float(LATENCY))
+
+
+def replayed(name, key=()):
+    """The recorded response for (name, key), time-shifted, or None. Each call gets its own copy."""
+    entry = store.lookup(name, key)
+    if entry is None:
+        return None
+    value, seconds = entry
+    _sleep(seconds)
+    return _shift(name, copy.deepcopy(value), _shift_delta())
+
+
+def recorded(name, key=lambda *args, **kwargs: (), replay=None, record=True, once=False):
+    """
+    Route a backend call through the snapshot. Off: call through. record: call through and save the
+    result under key(*args) (only the first result per key if once). replay: return the saved result,
+    or replay(*args) when given.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if MODE == "replay":
+                if replay is not None:
+                    return replay(*args, **kwargs)
+                return replayed(name, key(*args, **kwargs))
+            if MODE != "record" or not record:
+                return fn(*args, **kwargs)
+
+            start = time.perf_counter()
+            result = fn(*args, **kwargs)
+            if result is not None and not (once and store.lookup(name, key(*args, **kwargs))):
+                store.record(name, key(*args, **kwargs), result, time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorator
+
+
+# --- Offline stand-ins for writes ---
+
+class OfflineWorksheet:
+    """Accepts Sheets writes during replay and drops them."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_all_values(self):
+        return []
+
+    def append_row(self, row):
+        return self.append_rows([row])
+
+    def append_rows(self, rows):
+        print(f"📼 Replay: skipped writing {len(rows)} rows to '{self.name}'")
+        return {}
+
+    def update(self, range_name, values):
+        print(f"📼 Replay: skipped updating {range_name} in '{self.name}'")
+
+
+class OfflineSpreadsheet:
+    def worksheet(self, name):
+        return OfflineWorksheet(name)
+
+    def add_worksheet(self, name, rows, cols):
+        return OfflineWorksheet(name)
+
+
+class OfflineSheetsClient:
+    def open_by_key(self, key):
+        return OfflineSpreadsheet()
+
+
+# --- Headless recording ---
+
+def record_all(days=15):
+    """Record Sheets, the Leetify history for `days`, every game in Sheets and the Supabase table."""
+    global MODE
+    MODE = "record"
+    from DataInput import fetch_all_sheets_data
+    from Leetify import fetch_profile, fetch_game_details
+    from Konsum import fetch_supabase_konsum_data
+    import streamlit as st
+
+    games_df, _, _ = fetch_all_sheets_data()
+    now = datetime.utcnow()
+    fetch_profile(st.secrets["leetify"]["api_token"], now - timedelta(days=days), now)
+    for game_id in games_df.get("game_id", []):
+        fetch_game_details(game_id)
+    fetch_supabase_konsum_data()
+    store.save()
+    print(f"✅ Recorded {sum(len(v) for v in store.calls.values())} responses to {store.path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record a full backend snapshot for offline replay.")
+    parser.add_argument("--days", type=int, default=15, help="Leetify history window to record")
+    args = parser.parse_args(argv)
+    record_all(args.days)
+
+
+if __name__ == "__main__":
+    # Run through the imported module, so the decorated backend functions share this store
+    import Snapshot
+    Snapshot.main()
@@ -0,0 +1,78 @@
+import numpy as np
+from Players import PLAYER_NAMES
+from BubbeRating import bubbe_rating, TRADE_WEIGHT, BEER_WEIGHT
+
+# Stats Page
+STAT_MAP = {
+    "K/D Ratio": "kdRatio", "ADR": "dpr", "HLTV Rating": "hltvRating", "Reaction Time": "reactionTime", "TradeAttempts": "tradeKillAttemptsPercentage",
+    "Enemies Flashed": "flashbangThrown", "2k Kills": "multi2k", "3k Kills": "multi3k"
+}
+
+# Row columns used for team results only, not exported
+RESULT_COLUMNS = ["Team", "Won"]
+# PlayerRecord.result -> Won (NaN: unknown, e.g. payloads without teamScores)
+WON = {"win": 1.0, "loss": 0.0, "tie": 0.0}
+
+
+def game_label(game):
+    return f"{game['map_name']} ({game['game_finished_at'].strftime('%d.%m.%y %H:%M')})"
+
+
+def player_game_rows(label, details, konsum):
+    """
+    One stats row per allowed player in a projected Leetify game, with beer/water from konsum (keyed by player_key).
+    Team and Won are the player's own team and its result.
+    """
+    rows = []
+    for p in (details or {}).get("playerStats", []):
+        counts = konsum.get(p.player_key, {})
+        row = {
+            "Game": label,
+            "player_key": p.player_key,
+            "Player": p.name,
+            "Beer": counts.get("beer", 0),
+            "Water": counts.get("water", 0),
+            "Team": p.team,
+            "Won": WON.get(p.result, np.nan),
+        }
+        # Add all stats in STAT_MAP
+        for display_name, stat_key in STAT_MAP.items():
+            val = getattr(p, stat_key)
+            # tradeKillAttemptsPercentage needs scaling
+            if stat_key == "tradeKillAttemptsPercentage":
+                val = val * 100
+            row[display_name] = val
+        rows.append(row)
+    return rows
+
+
+def aggregate_player_stats(df, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """Per-player sums/averages over all games in df, plus BubbeRating."""
+    # --- Compute per-player averages ---
+    grouped = df.groupby("player_key").agg({
+    "Game": "nunique",
+    "Beer": "sum",
+    "Water": "sum",
+    "K/D Ratio": "mean",
+    "ADR": "mean",
+    "HLTV Rating": "mean",
+    "Reaction Time": "mean",
+    "TradeAttempts": "mean"
+}).rename(columns={"Game": "Games"}).reset_index()
+    grouped.insert(1, "Player", PLAYER_NAMES[grouped["player_key"].to_numpy()])
+
+    # --- BubbeRating, with the player's beer per game played ---
+    grouped["BubbeRating"] = bubbe_rating(
+        grouped["HLTV Rating"], grouped["TradeAttempts"], grouped["Beer"] / grouped["Games"],
+        trade_weight, beer_weight
+    ).round(2)
+
+    return grouped
+
+
+def add_game_bubbe_rating(df_full, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """BubbeRating per row (one player in one game): same formula, beer per game is that game's beer."""
+    df_full["BubbeRating"] = bubbe_rating(
+        df_full["HLTV Rating"], df_full["TradeAttempts"], df_full["Beer"], trade_weight, beer_weight
+    ).round(2)
+    return df_full
@@ -0,0 +1,105 @@
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from Players import PLAYER_NAMES
+from BubbeRating import bubbe_rating, TRADE_WEIGHT, BEER_WEIGHT
+
+# Matrices from synergy_matrices(), in display order
+SYNERGY_MATRICES = ["Shared games", "Win rate", "HLTV", "BubbeRating", "Beer/HLTV correlation"]
+
+
+def game_matrices(rows, wins, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """
+    Team-games x players arrays from per-game stats rows (game_id, player_key, Team, Won, HLTV Rating,
+    TradeAttempts, Beer). Each (game_id, Team) is its own row, so players are only together on the same team.
+    Returns (player_keys, A, won, values): A is the 0/1 incidence matrix, won is 1.0 per won team-game and
+    values holds HLTV, BubbeRating (with that game's beer) and Beer, zero where the player did not play.
+    Won is the team's own result; where it is unknown, wins (bool Series by game_id, the match result of the
+    Leetify profile owner) is used instead. Repeated game_ids keep their first result.
+    """
+    rows = rows.drop_duplicates(["game_id", "player_key"])
+    teams = rows["Team"] if "Team" in rows.columns else pd.Series(0, index=rows.index)
+    game_idx = pd.DataFrame({"game_id": rows["game_id"], "Team": teams}).groupby(["game_id", "Team"], sort=False).ngroup().to_numpy()
+    player_idx, player_keys = pd.factorize(rows["player_key"], sort=True)
+    shape = (game_idx.max() + 1 if len(game_idx) else 0, len(player_keys))
+
+    A = np.zeros(shape)
+    A[game_idx, player_idx] = 1.0
+    rating = bubbe_rating(rows["HLTV Rating"], rows["TradeAttempts"], rows["Beer"], trade_weight, beer_weight)
+    values = {}
+    for name, column in (("HLTV", rows["HLTV Rating"]), ("BubbeRating", rating), ("Beer", rows["Beer"])):
+        values[name] = np.zeros(shape)
+        values[name][game_idx, player_idx] = pd.to_numeric(column, errors="coerce").fillna(0).to_numpy()
+
+    wins = wins[~wins.index.duplicated()].astype(float)
+    owner_won = rows["game_id"].map(wins)
+    row_won = rows["Won"].astype(float) if "Won" in rows.columns else pd.Series(np.nan, index=rows.index)
+    won = np.zeros(shape[0])
+    won[game_idx] = row_won.fillna(owner_won).fillna(0).to_numpy()
+    return np.asarray(player_keys), A, won, values
+
+
+def synergy_matrices(rows, wins, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT, min_games=1):
+    """
+    Player x player matrices over the games both players were in on the same team (row player's stats with the column player):
+    shared games, win rate, mean HLTV, mean BubbeRating and the correlation of beer with HLTV.
+    The diagonal is the player's own record over all their games. Cells with fewer than min_games are NaN.
+    """
+    player_keys, A, won, values = game_matrices(rows, wins, trade_weight, beer_weight)
+    names = PLAYER_NAMES[player_keys]
+
+    # Every matrix is a (players x games) @ (games x players) product with the incidence matrix
+    shared = A.T @ A
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.where(shared >= min_games, shared, np.nan)
+        win_rate = (A.T @ (A * won[:, None])) / n
+        hltv = (values["HLTV"].T @ A) / n
+        rating = (values["BubbeRating"].T @ A) / n
+
+        # Pearson correlation from sums: n*Sxy - Sx*Sy over sqrt((n*Sxx - Sx^2)(n*Syy - Sy^2))
+        beer, h = values["Beer"], values["HLTV"]
+        sx, sy = beer.T @ A, h.T @ A
+        sxx, syy, sxy = (beer ** 2).T @ A, (h ** 2).T @ A, (beer * h).T @ A
+        corr = (n * sxy - sx * sy) / np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+
+    frame = lambda m: pd.DataFrame(m, index=names, columns=names)
+    return {
+        "Shared games": frame(shared.astype(int)),
+        "Win rate": frame(win_rate),
+        "HLTV": frame(hltv),
+        "BubbeRating": frame(rating),
+        "Beer/HLTV correlation": frame(corr),
+    }
+
+
+def best_groups(rows, wins, size=2, min_games=3, trade_weight=TRADE_WEIGHT, beer_weight=BEER_WEIGHT):
+    """
+    Duos (size=2) or trios (size=3) that played at least min_games together on one team: games, win rate and the
+    group's mean HLTV and BubbeRating in those games, best win rate first.
+    """
+    player_keys, A, won, values = game_matrices(rows, wins, trade_weight, beer_weight)
+    if len(player_keys) < size:
+        return pd.DataFrame(columns=["Players", "Games", "Win rate", "HLTV", "BubbeRating"])
+
+    # Co-occurrence tensors, e.g. size 3: sum_g A[g,i] * A[g,j] * A[g,k]
+    axes = "ijk"[:size]
+    subscripts = ",".join(f"g{a}" for a in axes) + "->" + axes
+    together = lambda *ops: np.einsum(subscripts, *ops)
+    games = together(*[A] * size)
+    wins_together = together(A * won[:, None], *[A] * (size - 1))
+    # Group totals: each member's value in the games the whole group shared
+    member_sum = lambda v: sum(together(*[v if m == pos else A for m in range(size)]) for pos in range(size))
+    hltv, rating = member_sum(values["HLTV"]), member_sum(values["BubbeRating"])
+
+    idx = tuple(np.array(list(combinations(range(len(player_keys)), size))).T)
+    n = games[idx]
+    names = PLAYER_NAMES[player_keys]
+    groups = pd.DataFrame({
+        "Players": [" + ".join(names[list(c)]) for c in zip(*idx)],
+        "Games": n.astype(int),
+        "Win rate": wins_together[idx] / np.maximum(n, 1),
+        "HLTV": hltv[idx] / np.maximum(n * size, 1),
+        "BubbeRating": rating[idx] / np.maximum(n * size, 1),
+    })
+    groups = groups[groups["Games"] >= min_games]
+    return groups.sort_values(["Win rate", "BubbeRating"], ascending=False).reset_index(drop=True)
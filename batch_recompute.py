@@ -0,0 +1,107 @@
+"""
+Headless recompute of all derived data (stats tables, BubbeRating, konsum-to-game mapping).
+Runs without `streamlit run`, e.g. from cron:
+
+    python batch_recompute.py --out derived --workers 8
+
+Games are partitioned by month and each month is processed in its own worker process.
+Secrets are read from .streamlit/secrets.toml like the app does.
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import Leetify
+from DataInput import fetch_all_sheets_data, konsum_counts, typed_games
+from Leetify import fetch_game_details
+from Konsum import fetch_supabase_konsum_data, assign_konsum_to_games, konsum_data_for_game
+from BubbeRating import sweep
+from Stats import game_label, player_game_rows, aggregate_player_stats, add_game_bubbe_rating
+
+
+def recompute_month(month, games, konsum_df, archive_dir=None):
+    """Build the per-game player stats rows for one month of games (runs in a worker)."""
+    Leetify.ARCHIVE_DIR = archive_dir or Leetify.ARCHIVE_DIR
+    rows = []
+    for g in games:
+        details = fetch_game_details(g["game_id"]) or {}
+        konsum = konsum_data_for_game(g["game_id"], konsum_df)
+        for row in player_game_rows(game_label(g), details, konsum):
+            rows.append({"game_id": g["game_id"], "Date": g["game_finished_at"].strftime("%Y-%m-%d %H:%M"), **row})
+    print(f"✅ {month}: {len(games)} games, {len(rows)} player rows")
+    return pd.DataFrame(rows)
+
+
+def partition_by_month(games_df, konsum_df):
+    """Yield (month, games, konsum rows for those games) so each worker only gets its own slice."""
+    for month, month_games in games_df.groupby(games_df["game_finished_at"].dt.to_period("M")):
+        month_konsum = konsum_df[konsum_df["game_id"].isin(month_games["game_id"])] if not konsum_df.empty else konsum_df
+        yield str(month), month_games.to_dict(orient="records"), month_konsum
+
+
+def write_sweep(df, out_dir, max_weight=2.0, steps=100):
+    """BubbeRating weight sweep over the full history: ranking stability per player and per combination."""
+    grid = np.linspace(0, max_weight, steps)
+    stability, combos = sweep(df, grid, grid)
+    stability.to_csv(os.path.join(out_dir, "bubberating_stability.csv"), index=False)
+    combos.to_csv(os.path.join(out_dir, "bubberating_sweep.csv"), index=False)
+    print(f"✅ BubbeRating sweep: {len(combos)} weight combinations")
+
+
+def recompute_all(out_dir, workers=None, include_konsum=True, archive_dir=None, sweep_steps=0):
+    games_df, konsum_df, ledger_df = fetch_all_sheets_data()
+    konsum_df = konsum_counts(konsum_df, ledger_df)
+    if games_df.empty:
+        print("⚠️ No games found in Google Sheets.")
+        return
+
+    # Same typed, one-row-per-game_id frame as the app, so a game saved twice is counted once
+    games_df = typed_games(games_df)
+    games_df = games_df.dropna(subset=["game_finished_at"]).sort_values("game_finished_at")
+    os.makedirs(out_dir, exist_ok=True)
+
+    # --- Stats tables, one month per task ---
+    partitions = list(partition_by_month(games_df, konsum_df))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(recompute_month, *part, archive_dir) for part in partitions]
+        frames = [f.result() for f in futures]
+
+    frames = [f for f in frames if not f.empty]
+    if frames:
+        df = pd.concat(frames, ignore_index=True)
+        add_game_bubbe_rating(df).to_csv(os.path.join(out_dir, "game_stats.csv"), index=False)
+        aggregate_player_stats(df).to_csv(os.path.join(out_dir, "player_stats.csv"), index=False)
+        if sweep_steps:
+            write_sweep(df, out_dir, steps=sweep_steps)
+        print(f"✅ Wrote {len(df)} player-game rows from {len(partitions)} months to {out_dir}")
+    else:
+        print("⚠️ No player data found across all games.")
+
+    # --- Konsum entries mapped to games ---
+    if include_konsum:
+        konsum_supabase = fetch_supabase_konsum_data()
+        assigned, skipped_count = assign_konsum_to_games(konsum_supabase, games_df)
+        if not assigned.empty:
+            assigned = assigned[["id", "game_id", "player_name_mapped", "drink_type", "datetime"]]
+            assigned.rename(columns={"player_name_mapped": "player_name"}).to_csv(
+                os.path.join(out_dir, "konsum_games.csv"), index=False
+            )
+        print(f"✅ Mapped {len(assigned)} konsum entries, skipped {skipped_count}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute all derived Bubberne tables without Streamlit.")
+    parser.add_argument("--out", default="derived", help="Output directory for the derived tables")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per core)")
+    parser.add_argument("--skip-konsum", action="store_true", help="Do not fetch and map Supabase konsum entries")
+    parser.add_argument("--archive", default=None, help="Also archive raw Leetify payloads as .json.gz in this directory")
+    parser.add_argument("--sweep", type=int, default=0, metavar="STEPS",
+                        help="Also sweep BubbeRating weights over STEPS x STEPS combinations in [0, 2]")
+    args = parser.parse_args(argv)
+    recompute_all(args.out, workers=args.workers, include_konsum=not args.skip_konsum,
+                  archive_dir=args.archive, sweep_steps=args.sweep)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""
+Multi-session load test for the Streamlit app. N simulated sessions click through the
+Home, Konsum and Stats pages with Streamlit's AppTest, against local fakes for Google Sheets,
+Leetify, Supabase and Discord (nothing leaves the machine):
+
+    python load_test.py --sessions 8 --rounds 3 --games 300 --latency 0.05
+    python load_test.py --sessions 8 --processes   # each session in its own process, truly in parallel
+
+AppTest is not thread-safe, so sessions never share a thread pool. By default they take turns rerun by
+rerun in one process, sharing the process-wide caches the way sessions of one server do. With
+--processes every session gets its own process, fakes and caches.
+
+Reports p50/p95/p99 rerun latency, external calls per rerun and total backend calls.
+Background calls (the konsum ingestion loop) are counted separately. A rerun that raises, shows an
+exception or cannot find its widget counts as an errored sample.
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from streamlit.runtime.secrets import Secrets
+from streamlit.testing.v1 import AppTest
+import DataInput
+import Konsum
+import Leetify
+from KonsumStream import LocalEntries
+from Players import NAME_MAPPING
+
+APP_PATH = "streamlit_app.py"
+PAGES = ("🏠 Home", "📝 Konsum", "📊 Stats")
+# session_state key the fakes use to attribute backend calls to a simulated session
+SESSION_KEY = "_load_test_session"
+
+MAPS = ["de_mirage", "de_inferno", "de_nuke", "de_ancient", "de_anubis", "de_vertigo"]
+
+
+# --- Backend call accounting ---
+
+class CallLog:
+    """Counts backend calls per (session, backend). Calls outside a script run count as 'background'."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, backend):
+        session = "background"
+        if get_script_run_ctx() is not None:
+            session = st.session_state.get(SESSION_KEY, "unknown")
+        with self._lock:
+            self.calls[(session, backend)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def session_total(self, session):
+        with self._lock:
+            return sum(n for (s, _), n in self.calls.items() if s == session)
+
+    def by_backend(self, background=False):
+        with self._lock:
+            totals = Counter()
+            for (session, backend), n in self.calls.items():
+                if (session == "background") == background:
+                    totals[backend] += n
+            return totals
+
+
+# --- Fakes ---
+
+class FakeWorksheet:
+    def __init__(self, log, values):
+        self.log = log
+        self._lock = threading.Lock()
+        self.values = [list(row) for row in values]
+
+    def get_all_values(self):
+        self.log.record("sheets.read")
+        with self._lock:
+            return [list(row) for row in self.values]
+
+    def append_row(self, row):
+        return self.append_rows([row])
+
+    def append_rows(self, rows):
+        self.log.record("sheets.write")
+        with self._lock:
+            self.values.extend([str(v) for v in row] for row in rows)
+            end = len(self.values)
+        return {"updates": {"updatedRange": f"sheet!A{end - len(rows) + 1}:F{end}"}}
+
+    def update(self, range_name, values):
+        self.log.record("sheets.write")
+
+
+class FakeSpreadsheet:
+    def __init__(self, log, sheets):
+        self.log = log
+        self.sheets = {name: FakeWorksheet(log, values) for name, values in sheets.items()}
+
+    def worksheet(self, name):
+        if name not in self.sheets:
+            raise gspread.WorksheetNotFound(name)
+        return self.sheets[name]
+
+    def add_worksheet(self, name, rows, cols):
+        self.sheets[name] = FakeWorksheet(self.log, [])
+        return self.sheets[name]
+
+
+class FakeSheetsClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+
+class FakeQuery:
+    """Just enough of the supabase-py query builder for Konsum.py."""
+
+    def __init__(self, log, entries):
+        self.log = log
+        self.entries = entries
+        self.last_id = None
+        self.limit_rows = None
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.last_id = value
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self.limit_rows = n
+        return self
+
+    def execute(self):
+        self.log.record("supabase")
+        frame = self.entries.fetch_since(self.last_id or 0, self.limit_rows or 10**9)
+        if frame.empty:
+            return SimpleNamespace(data=[])
+        frame = frame.rename(columns={"player_name": "name"})
+        frame["datetime"] = frame["datetime"].map(lambda t: t.isoformat())
+        return SimpleNamespace(data=frame.to_dict(orient="records"))
+
+
+class FakeSupabase:
+    def __init__(self, log, entries):
+        self.log = log
+        self.entries = entries
+
+    def table(self, name):
+        return FakeQuery(self.log, self.entries)
+
+
+# --- Synthetic data ---
+
+def synthetic_backends(n_games, days, n_new_games=0, seed=0):
+    """Sheets values, Leetify history/details and Supabase entries for n_games games over the last `days` days."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    aliases = list(NAME_MAPPING)
+    players = defaultdict(list)  # one alias per player per game
+    for alias, player in NAME_MAPPING.items():
+        players[player].append(alias)
+
+    games, details = [], {}
+    for i in range(n_games + n_new_games):
+        finished_at = now - timedelta(days=days) * (1 - (i + 0.5) / (n_games + n_new_games))
+        game_id = f"game-{i:05d}"
+        games.append({
+            "id": game_id,
+            "finishedAt": (finished_at - timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "mapName": rng.choice(MAPS),
+            "score": [rng.randint(0, 13), 13],
+            "playerStats": {"matchResult": rng.choice(["win", "loss", "tie"])},
+            "saved_at": finished_at.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        # Friends usually share a team, but some lobbies put them on both sides
+        details[game_id] = {
+            "playerStats": [
+                {"name": name, "initialTeamNumber": rng.choice([2, 2, 2, 3]),
+                 **{field: rng.random() * 2 for field in Leetify.PLAYER_FIELDS}}
+                for name in [rng.choice(players[p]) for p in rng.sample(sorted(players), 5)] + ["Stranger"]
+            ],
+            "teamScores": [{"teamNumber": 2, "score": rng.randint(0, 13)}, {"teamNumber": 3, "score": 13}],
+        }
+
+    saved = games[:n_games]
+    games_values = [["game_id", "map_name", "match_result", "score_team1", "score_team2", "game_finished_at"]] + [
+        [g["id"], g["mapName"], g["playerStats"]["matchResult"], str(g["score"][0]), str(g["score"][1]), g["saved_at"]]
+        for g in saved
+    ]
+
+    # A few drinks after each game; the first half is already in the ledger
+    entries, ledger_values = LocalEntries(), [DataInput.LEDGER_COLUMNS]
+    for i, g in enumerate(saved):
+        finished_at = datetime.strptime(g["saved_at"], "%Y-%m-%d %H:%M:%S")
+        for _ in range(rng.randint(0, 8)):
+            name = rng.choice(aliases)
+            drink = rng.choice(["Beer", "Vann"])
+            entry_id = entries.insert(name, drink, (finished_at + timedelta(minutes=rng.randint(1, 120))).isoformat() + "+00:00")
+            if i < n_games // 2:
+                ledger_values.append([str(entry_id), g["id"], NAME_MAPPING[name], "beer" if drink == "Beer" else "water"])
+
+    sheets = {
+        "games": games_values,
+        "konsum": [["game_id", "player_name", "beer", "water", "IDs"]],
+        DataInput.LEDGER_SHEET: ledger_values,
+    }
+    return sheets, games, details, entries
+
+
+def install_fakes(log, sheets, games, details, entries):
+    """Point DataInput, Leetify, Konsum and the Discord webhook at the in-memory fakes."""
+    client = FakeSheetsClient(FakeSpreadsheet(log, sheets))
+    supabase = FakeSupabase(log, entries)
+
+    def connect_to_gsheet():
+        log.record("sheets.auth")
+        return client
+
+    def fetch_profile(token, start_date, end_date, count=30):
+        log.record("leetify.profile")
+        return {"games": [g for g in games if start_date.isoformat() <= g["finishedAt"][:-1] <= end_date.isoformat()]}
+
+    def fetch_raw_game_details(game_id):
+        log.record("leetify.game")
+        return details.get(game_id)
+
+    def post(url, json=None, **kwargs):
+        log.record("discord")
+        return SimpleNamespace(status_code=204)
+
+    DataInput.connect_to_gsheet = connect_to_gsheet
+    Leetify.fetch_profile = fetch_profile
+    Leetify.fetch_raw_game_details = fetch_raw_game_details
+    Konsum.get_supabase = lambda: supabase
+    requests.post = post
+
+    secrets = Secrets()
+    secrets._secrets = {
+        "leetify": {"api_token": "load-test"},
+        "discord": {"webhook": "http://localhost/discord"},
+        "supabase": {"url": "http://localhost/supabase", "key": "load-test"},
+    }
+    st.secrets = secrets
+
+
+# --- Sessions ---
+
+def session_steps(session, log, rounds, refresh, timeout):
+    """One simulated user: open the app, then visit every page `rounds` times. Yields one sample per rerun."""
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state[SESSION_KEY] = session
+
+    def timed(page, action):
+        before = log.session_total(session)
+        start = time.perf_counter()
+        try:
+            action()
+            error = at.exception[0].value if at.exception else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return {
+            "session": session, "page": page, "seconds": time.perf_counter() - start,
+            "calls": log.session_total(session) - before, "error": error is not None, "detail": error,
+        }
+
+    def visit(page):
+        at.sidebar.radio[0].set_value(page).run()
+
+    def click(label):
+        button = next((b for b in at.button if b.label == label), None)
+        if button is None:
+            raise LookupError(f"no '{label}' button")
+        button.click().run()
+
+    yield timed("🏠 Home", at.run)
+    for round_no in range(rounds):
+        for page in PAGES:
+            yield timed(page, lambda: visit(page))
+            if refresh and round_no == 0 and page == PAGES[0]:
+                yield timed("🔄 Refresh", lambda: click("🔄 Refresh Data"))
+
+
+def run_sessions(sessions, log, rounds, refresh, timeout):
+    """All sessions in this process, taking turns one rerun at a time."""
+    runs = [session_steps(session, log, rounds, refresh, timeout) for session in sessions]
+    samples = []
+    while runs:
+        for run in list(runs):
+            sample = next(run, None)
+            if sample is None:
+                runs.remove(run)
+            else:
+                samples.append(sample)
+    return samples
+
+
+def session_process(session, args):
+    """--processes worker: fresh fakes and one session in this process. Returns (samples, backend calls)."""
+    quiet_streamlit_logs()
+    log = CallLog(args.latency)
+    install_fakes(log, *synthetic_backends(args.games, args.days, args.new_games))
+    return run_sessions([session], log, args.rounds, args.refresh, args.timeout), log.calls
+
+
+def quiet_streamlit_logs():
+    # AppTest sessions log a missing-context warning for every background thread access
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+
+def report(samples, log, elapsed):
+    df = pd.DataFrame(samples)
+    print(f"\n{len(df)} reruns from {df['session'].nunique()} sessions in {elapsed:.1f}s "
+          f"({df['error'].sum()} with errors)\n")
+    for detail, n in df["detail"].dropna().value_counts().head(5).items():
+        print(f"  ⚠️ {n}x {detail}")
+
+    def latency(group):
+        seconds = group["seconds"].to_numpy() * 1000
+        return pd.Series({
+            "reruns": len(group),
+            "p50 ms": np.percentile(seconds, 50), "p95 ms": np.percentile(seconds, 95),
+            "p99 ms": np.percentile(seconds, 99),
+            "calls/rerun": group["calls"].mean(), "max calls": group["calls"].max(),
+        })
+
+    table = df.groupby("page")[["seconds", "calls"]].apply(latency)
+    table.loc["all"] = latency(df)
+    print(table.round(1).to_string())
+
+    print("\nBackend calls from reruns:")
+    for backend, n in sorted(log.by_backend().items()):
+        print(f"  {backend:<16} {n}")
+    print("Backend calls from the ingestion loop:")
+    for backend, n in sorted(log.by_backend(background=True).items()):
+        print(f"  {backend:<16} {n}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive N AppTest sessions against local backend fakes.")
+    parser.add_argument("--sessions", type=int, default=8, help="Simulated sessions")
+    parser.add_argument("--rounds", type=int, default=3, help="Times each session visits every page")
+    parser.add_argument("--games", type=int, default=200, help="Games already in the fake Sheets")
+    parser.add_argument("--days", type=int, default=10, help="Games are spread over this many past days")
+    parser.add_argument("--new-games", type=int, default=0, help="Extra games only Leetify knows about (found on refresh)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated seconds per backend call")
+    parser.add_argument("--refresh", action="store_true", help="Every session also clicks 🔄 Refresh Data once")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds before a single rerun counts as hung")
+    parser.add_argument("--processes", action="store_true",
+                        help="Run every session in its own process (parallel, but no shared caches)")
+    args = parser.parse_args(argv)
+
+    quiet_streamlit_logs()
+    log = CallLog(args.latency)
+    start = time.perf_counter()
+    if args.processes:
+        # One fresh process per session, so no process ever runs two AppTests
+        with ProcessPoolExecutor(max_workers=args.sessions, max_tasks_per_child=1) as pool:
+            futures = [pool.submit(session_process, i, args) for i in range(args.sessions)]
+            samples = []
+            for future in futures:
+                session_samples, calls = future.result()
+                samples.extend(session_samples)
+                log.calls.update(calls)
+    else:
+        install_fakes(log, *synthetic_backends(args.games, args.days, args.new_games))
+        samples = run_sessions(range(args.sessions), log, args.rounds, args.refresh, args.timeout)
+    report(samples, log, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,69 +1,41 @@
 import streamlit as st
 import requests
 import base64
-import json
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import threading
-from supabase import create_client
-from operator import itemgetter
+from operator import attrgetter
 from datetime import datetime, timedelta
-from io import StringIO
-from DataInput import fetch_all_sheets_data, fetch_games_within_last_48_hours, fetch_konsum_data_for_game, save_konsum_data, save_game_data
-# API Endpoints
-PROFILE_API = "https://api.cs-prod.leetify.com/api/profile/id/"
-GAMES_API = "https://api.cs-prod.leetify.com/api/games/"
-leetify_token = st.secrets["leetify"]["api_token"]
-discord_webhook = st.secrets["discord"]["webhook"]
-
-SUPABASE_URL = st.secrets["supabase"]["url"]
-SUPABASE_KEY = st.secrets["supabase"]["key"]
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-# Player Name Mapping
-NAME_MAPPING = {
-    "JimmyJimbob": "Jepprizz", "Jimmy": "Jepprizz", "Kåre": "Torgrizz", "Kaare": "Torgrizz",
-    "Fakeface": "Birkle", "Killthem26": "Birkle", "Killbirk": "Birkle", "Lars Olaf": "Tobrizz", "tobbelobben": "Tobrizz",
-    "Bøghild": "Borgle", "Nish": "Sandrizz", "Nishinosan": "Sandrizz", "Zohan": "Jorizz", "johlyn": "Jorizz"
-}
-ALLOWED_PLAYERS = set(NAME_MAPPING.values())
-
-def fetch_supabase_konsum_data():
-    """Fetch all player consumption data from Supabase without filtering by allowed players."""
-    try:
-        response = supabase.table("entries").select("*").execute()
-        print("📝 Raw Supabase response:", response)
-        if not response.data:
-            print("⚠️ No consumption data found in Supabase.")
-            return pd.DataFrame()
-
-        df = pd.DataFrame(response.data)
-        print(f"Columns in Supabase data: {df.columns}")
-        print("Sample rows:\n", df.head())
-
-        # Ensure datetime column is parsed correctly
-        if 'datetime' in df.columns:
-            df['datetime'] = pd.to_datetime(df['datetime'], utc=True, errors='coerce')
-        else:
-            print("⚠️ No 'datetime' column found in Supabase data")
-            df['datetime'] = pd.NaT
+from DataInput import fetch_games_within_last_48_hours, fetch_konsum_data_for_game, save_konsum_data, save_konsum_entries, save_games_data, load_sheets, sheets_stale
+from DataInput import game_records, append_game_rows, append_ledger_entries, latest_entry_id, shared_games, shared_konsum, write_state_sizes
+from SingleFlight import single_flight
+from KonsumStream import KonsumIngestor
+from Leetify import fetch_profile, fetch_game_details, games_from_profile
+from Konsum import fetch_supabase_konsum_data, fetch_supabase_entries_since, assign_konsum_to_games, ledger_entries
+from Charts import stat_figure, data_version
+from BubbeRating import sweep, TRADE_WEIGHT, BEER_WEIGHT
+from Synergy import SYNERGY_MATRICES, synergy_matrices, best_groups
+from Form import FormCache, FORM_METRICS, FORM_WINDOWS
+from Stats import STAT_MAP, RESULT_COLUMNS, game_label, player_game_rows, aggregate_player_stats, add_game_bubbe_rating
+from Export import EXPORT_FORMATS, filter_export, export_bytes, export_file_name
+from Snapshot import snapshot_mode
+from Memory import MEMORY_BUDGET_MB, deep_sizeof, game_cache, session_cache, rss_mb
+# Replaying a snapshot runs fully offline, without secrets
+offline = snapshot_mode() == "replay"
+leetify_token = "" if offline else st.secrets["leetify"]["api_token"]
+discord_webhook = "" if offline else st.secrets["discord"]["webhook"]
+
+# How often the konsum ingestion loop polls Supabase and the Konsum page re-renders
+KONSUM_POLL_SECONDS = 5
+# The loop stops polling when no session has run for this long, and resumes on the next one
+KONSUM_IDLE_SECONDS = 120
 
-        # Keep the original name column for mapping later if needed
-        df.rename(columns={'name': 'player_name'}, inplace=True)
-
-        print(f"✅ Retrieved {len(df)} konsum entries from Supabase")
-        return df
-
-    except Exception as e:
-        print(f"⚠️ Supabase fetch error: {e}")
-        return pd.DataFrame()
-
-    
 
 def map_konsum_to_games_and_save(konsum_df, games_df, hours_window=24):
     """
-    Map Supabase konsum entries to the closest previous game and save to Sheets.
-    Avoids double-counting by checking existing IDs in session_state.
+    Map Supabase konsum entries to the closest previous game and save to the konsum ledger.
+    Avoids double-counting through the ledger's unique entry_id index.
     Works with all players, no filtering by ALLOWED_PLAYERS.
     """
 
@@ -71,83 +43,15 @@ def map_konsum_to_games_and_save(konsum_df, games_df, hours_window=24):
         print("⚠️ No konsum or game data to map.")
         return
 
-    # --- Clean and prepare games data ---
-    games_df = games_df.copy()
-    games_df['game_finished_at'] = pd.to_datetime(games_df['game_finished_at'], utc=True, errors='coerce')
-    games_df = games_df.dropna(subset=['game_finished_at']).sort_values('game_finished_at')
-
-    # --- Clean konsum data ---
-    konsum_df['datetime'] = pd.to_datetime(konsum_df['datetime'], utc=True, errors='coerce')
-    konsum_df = konsum_df.dropna(subset=['datetime'])
-
-    # --- Normalize drink types ---
-    def map_drink(x):
-        if isinstance(x, str):
-            x = x.lower()
-            if "beer" in x: return "beer"
-            if "vann" in x: return "water"
-        return None
+    # --- Closest previous game per entry (vectorized) ---
+    assigned, skipped_count = assign_konsum_to_games(konsum_df, games_df, hours_window)
+    if assigned.empty:
+        print(f"🚫 Skipped {skipped_count} konsum entries (no matching game, too far after).")
+        return
 
-    konsum_df['drink_type'] = konsum_df['bgdata'].map(map_drink)
-    konsum_df = konsum_df.dropna(subset=['drink_type'])
-
-    # --- Map player names using NAME_MAPPING, but keep all if not mapped ---
-    konsum_df['player_name_mapped'] = konsum_df['player_name'].map(NAME_MAPPING)
-    konsum_df['player_name_mapped'] = konsum_df['player_name_mapped'].fillna(konsum_df['player_name'])
-
-    # --- Prepare batch updates ---
-    batch_updates = {}
-    saved_count = 0
-    skipped_count = 0
-
-    for _, row in konsum_df.iterrows():
-        player_name = row.get('player_name_mapped')
-        drink_type = row.get('drink_type')
-        ts = row.get('datetime')
-        entry_id = row.get('id')
-
-        if not player_name or pd.isna(ts) or pd.isna(entry_id):
-            continue
-
-        # --- Find the closest previous game ---
-        past_games = games_df[games_df['game_finished_at'] <= ts].sort_values('game_finished_at', ascending=False)
-        if past_games.empty:
-            skipped_count += 1
-            continue
-
-        closest_game = past_games.iloc[0]
-        game_id = closest_game['game_id']
-        game_time = closest_game['game_finished_at']
-
-        # --- Skip if konsum happened too long after the game ended ---
-        if ts - game_time > pd.Timedelta(hours=hours_window):
-            skipped_count += 1
-            continue
-
-        # --- Initialize batch entry ---
-        if game_id not in batch_updates:
-            batch_updates[game_id] = {}
-
-        if player_name not in batch_updates[game_id]:
-            existing = st.session_state['cached_konsum'].get(game_id, {}).get(player_name, {'beer': 0, 'water': 0, 'ids': []})
-            existing.setdefault('ids', [])
-            batch_updates[game_id][player_name] = existing.copy()
-
-        # --- Only count if ID not already present ---
-        if entry_id not in batch_updates[game_id][player_name]['ids']:
-            batch_updates[game_id][player_name][drink_type] += 1
-            batch_updates[game_id][player_name]['ids'].append(entry_id)
-            saved_count += 1
-
-    # --- Save updates if any ---
-    if batch_updates:
-        save_konsum_data(batch_updates)
-        # Update session_state cache
-        for game_id, players in batch_updates.items():
-            if game_id not in st.session_state['cached_konsum']:
-                st.session_state['cached_konsum'][game_id] = {}
-            for player_name, values in players.items():
-                st.session_state['cached_konsum'][game_id][player_name] = values
+    # --- One ledger row per entry, already-saved ids are skipped ---
+    entries = ledger_entries(assigned)
+    saved_count = save_konsum_entries(entries)
 
     print(f"✅ Saved {saved_count} new konsum records to Sheets.")
     print(f"🚫 Skipped {skipped_count} konsum entries (no matching game, too far after).")
@@ -164,17 +68,10 @@ def initialize_session_state(days=2):
     if 'initialized' not in st.session_state:
         st.session_state['initialized'] = True
 
-        games_df, konsum_df = fetch_all_sheets_data()
-        st.session_state['games_df'] = games_df
-        st.session_state['konsum_df'] = konsum_df
-
-        cached_games = fetch_games_within_last_48_hours()  # from Sheets
-
-        # 4️⃣ Store in session_state
-        st.session_state['cached_games'] = cached_games
-        st.session_state['cached_konsum'] = {}
-        for game in cached_games:
-            st.session_state['cached_konsum'][game['game_id']] = fetch_konsum_data_for_game(game['game_id'])
+    # Sheets are read into the shared games table and konsum counts once per process and re-read when
+    # the last read is older than SHEETS_TTL_SECONDS; sessions running at the same time share that read
+    if sheets_stale():
+        single_flight.do("load_sheets", load_sheets)
 
 def send_discord_notification(message: str):
     """Send a message to Discord via webhook."""
@@ -187,87 +84,79 @@ def send_discord_notification(message: str):
     except Exception as e:
         st.warning(f"Error sending Discord message: {e}")
 
-# Manual refresh button functionality
-def refresh_all(days):
+def sync_backends(days):
+    """Fetch new games, reload Sheets into the shared games table and konsum counts, and sync Supabase konsum."""
     # 1️⃣ Fetch new games from Leetify API
     new_games = fetch_new_games(days)
     print(f"New games fetched: {len(new_games)}")
 
     # 2️⃣ Reload everything from Sheets
-    games_df, konsum_df = fetch_all_sheets_data()
-    st.session_state['games_df'] = games_df
-    st.session_state['konsum_df'] = konsum_df
-
-    # 3️⃣ Update cached games
-    st.session_state['cached_games'] = fetch_games_within_last_48_hours()
-    st.session_state['cached_konsum'] = {}
-    for game in st.session_state['cached_games']:
-        st.session_state['cached_konsum'][game['game_id']] = fetch_konsum_data_for_game(game['game_id'])
-    
+    load_sheets()
+
     #only call supabase if new game
     if new_games:
 
         konsum_df_supabase = fetch_supabase_konsum_data()
-        games_df = st.session_state["games_df"]
+        games_df = shared_games.frame()
 
         if not konsum_df_supabase.empty:
             map_konsum_to_games_and_save(konsum_df_supabase, games_df)
             print("✅ Supabase konsum synced to Google Sheets.")
         else:
             print("⚠️ No Supabase konsum data found to sync.")
-    
 
-# Remove caching decorators since we use session state
-def get_cached_games(days):
-    return fetch_games_within_last_48_hours(days)
+# Manual refresh button functionality
+def refresh_all(days):
+    # Sessions refreshing at the same time share one in-flight fetch/write pass
+    single_flight.do(("refresh_all", days), sync_backends, days)
 
-def get_cached_konsum(game_id):
-    return fetch_konsum_data_for_game(game_id) or {}
+    konsum_ingestor().set_games(shared_games.frame())
 
-# Data Fetching Functions
 
-def fetch_profile(token, start_date, end_date, count=30):
-    print("📡 fetch_profile() called!")
-    url = "https://api.cs-prod.leetify.com/api/v2/games/history"
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
-
-    filters = {
-        "currentPeriod": {
-            "start": start_date.isoformat() + "Z",
-            "end": end_date.isoformat() + "Z",
-            "count": count
-        },
-        "previousPeriod": {
-            "start": (start_date - timedelta(days=30)).isoformat() + "Z",
-            "end": start_date.isoformat() + "Z",
-            "count": count
-        }
-    }
+def poll_new_games(games_df, token=leetify_token):
+    """
+    Session-free check for new Leetify games, used by the konsum ingestion loop.
+    New games go into the shared games table, so every session sees them on its next render.
+    """
+    now = datetime.utcnow()
+    profile_data = fetch_profile(token, now - timedelta(days=1), now)
+    if not profile_data or "games" not in profile_data:
+        return games_df
 
-    try:
-        response = requests.get(url, headers=headers, params={"filters": json.dumps(filters)})
-        response.raise_for_status()
-        data = response.json()
-        
-        return data
-    except requests.RequestException as e:
-        print(f"Failed fetching profile: {e}")
-        return None
+    new_games = games_from_profile(profile_data, shared_games.ids, 1, now=now)
+    if new_games:
+        append_game_rows(game_records(new_games))
+    return shared_games.frame()
+
+
+@st.cache_resource
+def konsum_ingestor():
+    """One konsum ingestion loop per server process, started by the first session and shared by all."""
+    return KonsumIngestor(
+        fetch_since=fetch_supabase_entries_since,
+        save_entries=append_ledger_entries,
+        games_df=shared_games.frame(),
+        refresh_games=poll_new_games,
+        interval=KONSUM_POLL_SECONDS,
+        last_id=latest_entry_id(),
+        idle_after=KONSUM_IDLE_SECONDS,
+    ).start()
+
+
+# Derived data lives in a process-wide LRU (Memory.session_cache) instead of session_state, keyed by
+# the version of the shared table it was built from, so every session reuses it and stale entries are evicted
+def get_cached_games(days):
+    key = ("games", days, shared_games.version)
+    return session_cache.get_or_build(key, lambda: fetch_games_within_last_48_hours(days))
 
-def fetch_game_details(game_id):
-    try:
-        response = requests.get(GAMES_API + game_id, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException:
-        return None
+def get_cached_konsum(game_id):
+    # Konsum counts are kept up to date process-wide, a lookup is O(players in the game)
+    return fetch_konsum_data_for_game(game_id)
+
+# Data Fetching Functions
 
 def fetch_new_games(days, token=leetify_token):
     """Fetch new games from Leetify API and save them immediately."""
-    new_games = []
     now = datetime.utcnow()
     start_date = now - timedelta(days=days)
 
@@ -276,42 +165,10 @@ def fetch_new_games(days, token=leetify_token):
         st.warning("No games found or invalid response")
         return []
 
-    existing_game_ids = set(st.session_state.get('games_df', pd.DataFrame()).get('game_id', []))
-
-    for game in profile_data.get("games", []):
-        game_id = game.get("id")
-        if not game_id or game_id in existing_game_ids or game_id in {g["game_id"] for g in new_games}:
-            continue
-
-        try:
-            finished_at = datetime.strptime(game["finishedAt"], "%Y-%m-%dT%H:%M:%S.%fZ") + timedelta(hours=1)
-            if finished_at > now - timedelta(days=days):
-                finished_at_str = finished_at.strftime("%Y-%m-%d %H:%M:%S")
-                score = game.get("score", [0, 0])
-                match_result = game.get("playerStats", {}).get("matchResult", "Unknown")
-
-                new_game = {
-                    "game_id": game_id,
-                    "map_name": game.get("mapName", "Unknown"),
-                    "match_result": match_result,
-                    "scores": score,
-                    "game_finished_at": finished_at_str
-                }
-                new_games.append(new_game)
-        except (ValueError, KeyError) as e:
-            st.error(f"Skipping game {game_id} due to error: {e}")
-            continue
-
-    # Save all new games to Sheets and session_state
-    for game in new_games:
-        save_game_data(
-            game["game_id"],
-            game["map_name"],
-            game["match_result"],
-            game["scores"][0],
-            game["scores"][1],
-            game["game_finished_at"]
-        )
+    new_games = games_from_profile(profile_data, shared_games.ids, days, now=now)
+
+    # Save all new games to Sheets and session_state in one batch
+    save_games_data(new_games)
 
     print(f"✅ {len(new_games)} new games fetched and saved.")
     return new_games
@@ -325,7 +182,7 @@ def async_save(game_id, name, beer_val, water_val):
     threading.Thread(target=_save, daemon=True).start()
 
 def get_player_stat(player, stat_key):
-    return player.get(stat_key, 0)
+    return getattr(player, stat_key, 0)
 
 # Home Page 
 def home_page(days):
@@ -345,32 +202,25 @@ def home_page(days):
     if game_data:
         details = fetch_game_details(game_id)
         if details:
-            players = [
-                {"name": NAME_MAPPING.get(p["name"], p["name"]), "reactionTime": p.get("reactionTime", 0),
-                 "tradeKillAttemptsPercentage": p.get("tradeKillAttemptsPercentage", 0),
-                 "utilityOnDeathAvg": p.get("utilityOnDeathAvg", 0),
-                 "hltvRating": p.get("hltvRating", 0)}
-                for p in details.get("playerStats", []) if NAME_MAPPING.get(p["name"], p["name"]) in ALLOWED_PLAYERS
-            ]
+            players = sorted(details.get("playerStats", []), key=attrgetter("reactionTime"))
             if players:
-                players.sort(key=itemgetter("reactionTime"))
-                min_rt = min(p["reactionTime"] for p in players)
-                max_rt = max(p["reactionTime"] for p in players)
+                min_rt = min(p.reactionTime for p in players)
+                max_rt = max(p.reactionTime for p in players)
 
-                best_trade = max(p["tradeKillAttemptsPercentage"]*100 for p in players)
-                worst_trade = min(p["tradeKillAttemptsPercentage"]*100 for p in players)
+                best_trade = max(p.tradeKillAttemptsPercentage*100 for p in players)
+                worst_trade = min(p.tradeKillAttemptsPercentage*100 for p in players)
 
-                top_players = [p for p in players if p["reactionTime"] == min_rt]
-                low_players = [p for p in players if p["reactionTime"] == max_rt]
+                top_players = [p for p in players if p.reactionTime == min_rt]
+                low_players = [p for p in players if p.reactionTime == max_rt]
 
-                best_trade_players = [p for p in players if p["tradeKillAttemptsPercentage"] * 100 == best_trade]
-                worst_trade_players = [p for p in players if p["tradeKillAttemptsPercentage"] * 100 == worst_trade]
+                best_trade_players = [p for p in players if p.tradeKillAttemptsPercentage * 100 == best_trade]
+                worst_trade_players = [p for p in players if p.tradeKillAttemptsPercentage * 100 == worst_trade]
 
-                worst_util = max(p.get("utilityOnDeathAvg", 0) for p in players)
-                best_hltv = max(p.get("hltvRating", 0) for p in players)
+                worst_util = max(p.utilityOnDeathAvg for p in players)
+                best_hltv = max(p.hltvRating for p in players)
 
-                worst_util_players = [p for p in players if p.get("utilityOnDeathAvg",0) == worst_util]
-                best_hltv_players = [p for p in players if p.get("hltvRating",0) == best_hltv]
+                worst_util_players = [p for p in players if p.utilityOnDeathAvg == worst_util]
+                best_hltv_players = [p for p in players if p.hltvRating == best_hltv]
 
                 # Add spacing between columns using st.columns with gap
                 col1, col2 = st.columns([1, 1], gap="small")
@@ -380,8 +230,8 @@ def home_page(days):
                     st.markdown(f"""
                         <div style="padding: 15px; background-color: #388E3C; color: white; border-radius: 10px; text-align: center; border: 1px solid black; margin: 5px;">
                             <h3>🔥 Reaction Time</h3>
-                            <h4>💪 Gooner: {', '.join(p['name'] for p in top_players)} ({min_rt}s)</h4>
-                            <h4>🍺 Pils-bitch: {', '.join(p['name'] for p in low_players)} ({max_rt}s)</h4>
+                            <h4>💪 Gooner: {', '.join(p.name for p in top_players)} ({min_rt}s)</h4>
+                            <h4>🍺 Pils-bitch: {', '.join(p.name for p in low_players)} ({max_rt}s)</h4>
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -389,8 +239,8 @@ def home_page(days):
                     st.markdown(f"""
                         <div style="padding: 15px; background-color: #1976D2; color: white; border-radius: 10px; text-align: center; border: 1px solid black; margin: 5px;">
                             <h3>🎯 Trade Kill Attempts</h3>
-                            <h4>✅ Rizzler: {', '.join(p['name'] for p in best_trade_players)} ({best_trade:.1f}%)</h4>
-                            <h4>❌ Baiterbot: {', '.join(p['name'] for p in worst_trade_players)} ({worst_trade:.1f}%)</h4>
+                            <h4>✅ Rizzler: {', '.join(p.name for p in best_trade_players)} ({best_trade:.1f}%)</h4>
+                            <h4>❌ Baiterbot: {', '.join(p.name for p in worst_trade_players)} ({worst_trade:.1f}%)</h4>
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -398,7 +248,7 @@ def home_page(days):
                     st.markdown(f"""
                         <div style="padding: 15px; background-color: #D32F2F; color: white; border-radius: 10px; text-align: center; border: 1px solid black; margin: 5px;">
                             <h3>💣 Utility on Death</h3>
-                            <h4>🔥 McRizzler: {', '.join(p['name'] for p in worst_util_players)} ({worst_util:.2f})</h4>
+                            <h4>🔥 McRizzler: {', '.join(p.name for p in worst_util_players)} ({worst_util:.2f})</h4>
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -406,7 +256,7 @@ def home_page(days):
                     st.markdown(f"""
                         <div style="padding: 15px; background-color: #301934; color: white; border-radius: 10px; text-align: center; border: 1px solid black; margin: 5px;">
                             <h3>🏆 Best HLTV Rating</h3>
-                            <h4>⭐ OhioMaster: {', '.join(p['name'] for p in best_hltv_players)} ({best_hltv:.2f})</h4>
+                            <h4>⭐ OhioMaster: {', '.join(p.name for p in best_hltv_players)} ({best_hltv:.2f})</h4>
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -422,7 +272,15 @@ def input_data_page(days):
         refresh_all(days)
         st.success("🔄 Data refreshed and Supabase konsum synced!")
 
-    # --- Fetch games after refresh or normal page load ---
+    konsum_games_view(days)
+
+
+@st.fragment(run_every=KONSUM_POLL_SECONDS)
+def konsum_games_view(days):
+    """Games with konsum, re-rendered every few seconds so new games and drinks show up without a refresh."""
+    konsum_ingestor().touch()
+
+    # --- Games from the shared table, including any the ingestion loop just found ---
     games = sorted(
         get_cached_games(days),
         key=lambda x: x.get("game_finished_at", datetime.min),
@@ -437,23 +295,21 @@ def input_data_page(days):
     all_players = set()
     for game in games:
         details = fetch_game_details(game.get("game_id")) or {}
-        game_details_map[game["game_id"]] = details
-        for p in details.get("playerStats", []):
-            name = NAME_MAPPING.get(p["name"], p["name"])
-            if name in ALLOWED_PLAYERS:
-                all_players.add(name)
+        game_details_map[game["game_id"]] = details.get("playerStats", [])
+        all_players.update(p.name for p in game_details_map[game["game_id"]])
 
     # --- Player Filter ---
     selected_players = st.multiselect(
         "👥 Filter players",
         options=sorted(all_players),
         default=[],
-        help="Select which gooners you want to view consumption for."
+        help="Select which gooners you want to view consumption for.",
+        key="konsum_players"
     )
 
     # --- Display each game with synced konsum data ---
     for game in games:
-        details = game_details_map.get(game["game_id"], {})
+        player_stats = game_details_map.get(game["game_id"], [])
         map_name = game.get("map_name", "Unknown")
         match_result = game.get("match_result", "Unknown")
         scores = [game.get("score_team1", 0), game.get("score_team2", 0)]
@@ -469,21 +325,19 @@ def input_data_page(days):
 
         label = f"🗺️ {map_name} | {match_result} ({scores[0]}:{scores[1]}) | {game_finished_at.strftime('%d.%m.%y %H:%M')}"
         with st.expander(label, expanded=False):
-            konsum = fetch_konsum_data_for_game(game["game_id"]) or {}
+            konsum = get_cached_konsum(game["game_id"])
             df_display = []
 
-            for p in details.get("playerStats", []):
-                name = NAME_MAPPING.get(p["name"], p["name"])
-                if name not in ALLOWED_PLAYERS:
-                    continue
+            for p in player_stats:
+                name = p.name
                 if selected_players and name not in selected_players:
                     continue
 
-                beer_val = konsum.get(name, {}).get("beer", 0)
-                water_val = konsum.get(name, {}).get("water", 0)
-                kd = p.get("kdRatio", 0)
-                adr = p.get("dpr", 0)
-                hltv = p.get("hltvRating", 0)
+                beer_val = konsum.get(p.player_key, {}).get("beer", 0)
+                water_val = konsum.get(p.player_key, {}).get("water", 0)
+                kd = p.kdRatio
+                adr = p.dpr
+                hltv = p.hltvRating
 
                 df_display.append({
                     "Player": name,
@@ -502,11 +356,6 @@ def input_data_page(days):
 
 
 # Stats Page
-STAT_MAP = {
-    "K/D Ratio": "kdRatio", "ADR": "dpr", "HLTV Rating": "hltvRating", "Reaction Time": "reactionTime", "TradeAttempts": "tradeKillAttemptsPercentage",
-    "Enemies Flashed": "flashbangThrown", "2k Kills": "multi2k", "3k Kills": "multi3k"
-}
-
 def load_all_stats(days):
     games = sorted(get_cached_games(days), key=lambda x: x["game_finished_at"])
     if not games:
@@ -516,62 +365,169 @@ def load_all_stats(days):
     for g in games:
         details = fetch_game_details(g["game_id"]) or {}
         konsum = get_cached_konsum(g["game_id"]) or {}
-        game_label = f"{g['map_name']} ({g['game_finished_at'].strftime('%d.%m.%y %H:%M')})"
+        for row in player_game_rows(game_label(g), details, konsum):
+            row["game_id"] = g["game_id"]
+            row["Date"] = g["game_finished_at"]
+            rows.append(row)
+
+    df = pd.DataFrame(rows)
+    grouped = aggregate_player_stats(df)
+
+    return df, grouped
+
+def load_history_stats(game_ids=None):
+    """Per-game player stats for every game in Sheets (not just the selected window), or only game_ids."""
+    games_df = shared_games.frame()
+    if games_df.empty:
+        return pd.DataFrame()
+    if game_ids is not None:
+        games_df = games_df[games_df['game_id'].isin(game_ids)]
+
+    rows = []
+    for g in games_df.dropna(subset=['game_finished_at']).to_dict(orient='records'):
+        details = fetch_game_details(g["game_id"]) or {}
+        for row in player_game_rows(game_label(g), details, get_cached_konsum(g["game_id"])):
+            rows.append({"game_id": g["game_id"], "Date": g["game_finished_at"], **row})
+    return pd.DataFrame(rows)
+
+
+@st.cache_resource
+def form_cache():
+    """Rolling form series shared by all sessions."""
+    return FormCache()
+
 
-        for p in details.get("playerStats", []):
-            name = NAME_MAPPING.get(p["name"], p["name"])
-            if name not in ALLOWED_PLAYERS:
+def history_rows():
+    """
+    The form cache brought up to date with every game in Sheets. Versions are per game (a hash of its
+    konsum counts in the shared state), so only new games, or games whose konsum changed, are rebuilt.
+    """
+    cache = form_cache()
+    game_ids = shared_games.frame()['game_id'].unique()
+    versions = {game_id: shared_konsum.game_version(game_id) for game_id in game_ids}
+    stale = cache.stale_games(versions)
+    if stale:
+        with st.spinner(f"Updating history for {len(stale)} games..."):
+            rows = load_history_stats(stale)
+            # Games without rows (e.g. Leetify details unavailable) stay stale and are retried next time
+            built = set(rows['game_id']) if not rows.empty else set()
+            cache.update(rows, {game_id: versions[game_id] for game_id in stale if game_id in built})
+    return cache
+
+
+def form_section():
+    with st.expander("📈 Form (rolling average over the last N games)"):
+        # Expander bodies run even while collapsed, so the full history only loads on request
+        if not st.toggle("Show form over all games in Sheets", key="form_history"):
+            st.caption("Loads every game's stats the first time, then only new or changed games.")
+            return
+
+        cache = history_rows()
+        if cache.rows.empty:
+            st.info("No player data yet.")
+            return
+
+        col1, col2 = st.columns(2)
+        metric = col1.selectbox("Metric", FORM_METRICS, key="form_metric")
+        window = col2.selectbox("Games in window", FORM_WINDOWS, index=1, key="form_window")
+        players = cache.rows[["player_key", "Player"]].drop_duplicates().sort_values("Player")
+        selected = st.multiselect("Players", players["Player"].tolist(), default=players["Player"].tolist(), key="form_players")
+
+        lines = []
+        for player_key, name in players.itertuples(index=False):
+            if name not in selected:
                 continue
+            series = cache.series(player_key, metric, window)
+            lines.append(pd.DataFrame({"Date": series.index, metric: series.to_numpy(), "Player": name}))
+        if lines:
+            fig = px.line(pd.concat(lines, ignore_index=True), x="Date", y=metric, color="Player",
+                          render_mode="webgl", title=f"{metric}, rolling {window}-game average")
+            st.plotly_chart(fig, use_container_width=True)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def synergy_tables(_rows, _wins, version, weights, min_games):
+    """Synergy matrices plus best duos and trios. Cached by (version, weights, min_games); the frames are not hashed."""
+    return (
+        synergy_matrices(_rows, _wins, *weights, min_games=min_games),
+        best_groups(_rows, _wins, 2, min_games, *weights),
+        best_groups(_rows, _wins, 3, min_games, *weights),
+    )
 
-            row = {
-                "Game": game_label,
-                "Player": name,
-                "Beer": konsum.get(name, {}).get("beer", 0),
-                "Water": konsum.get(name, {}).get("water", 0),
-            }
-            # Add all stats in STAT_MAP
-            for display_name, stat_key in STAT_MAP.items():
-                val = p.get(stat_key, 0)
-                # tradeKillAttemptsPercentage needs scaling
-                if stat_key == "tradeKillAttemptsPercentage":
-                    val = val * 100
-                row[display_name] = val
-            rows.append(row)
 
-    df = pd.DataFrame(rows)
+def synergy_section(df, trade_weight, beer_weight):
+    with st.expander("🤝 Synergy (who plays best together)"):
+        col1, col2 = st.columns(2)
+        full_history = col1.checkbox("Use full history (all games in Sheets)", key="synergy_history")
+        min_games = col2.number_input("Min games together", min_value=1, max_value=50, value=3, key="synergy_min_games")
+
+        rows = history_rows().rows if full_history else df
+        games_df = shared_games.frame()
+        if rows.empty or games_df.empty:
+            st.info("No player data yet.")
+            return
 
-    # --- Compute per-player averages ---
-    grouped = df.groupby("Player").agg({
-    "Beer": "sum",
-    "Water": "sum",
-    "K/D Ratio": "mean",
-    "ADR": "mean",
-    "HLTV Rating": "mean",
-    "Reaction Time": "mean",
-    "TradeAttempts": "mean"
-}).reset_index()
-
-    # --- BubbeRating ---
-    trade_weight = 0.5
-    beer_weight = 0.9
-    games_played = df["Game"].nunique()
-
-    grouped["BubbeRating"] = (
-        grouped["HLTV Rating"] +
-        grouped["HLTV Rating"] * ((grouped["Beer"] / games_played) * beer_weight) +
-        (grouped["TradeAttempts"] / 100) * trade_weight
-    ).round(2)
+        # Win/loss is each player's own team result; the Leetify profile owner's result only fills in
+        # games whose payload has no team scores (a game saved twice counts once)
+        games_df = games_df.drop_duplicates('game_id')
+        wins = pd.Series((games_df['match_result'] == "win").to_numpy(), index=games_df['game_id'])
+        rows = rows[["game_id", "player_key", *RESULT_COLUMNS, "HLTV Rating", "TradeAttempts", "Beer"]]
+        version = (data_version(rows), data_version(wins.to_frame()))
+        matrices, duos, trios = synergy_tables(rows, wins, version, (trade_weight, beer_weight), min_games)
+
+        matrix = st.selectbox("Matrix", SYNERGY_MATRICES, index=1, key="synergy_matrix")
+        values = matrices[matrix]
+        fig = px.imshow(values, text_auto=".0f" if matrix == "Shared games" else ".2f",
+                        color_continuous_scale="RdYlGn", aspect="auto",
+                        labels={"x": "With", "y": "Player", "color": matrix},
+                        title=f"{matrix}: row player in games with column player")
+        st.plotly_chart(fig, use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        col1.markdown("**Best duos**")
+        col1.dataframe(duos.head(10).round(2), hide_index=True)
+        col2.markdown("**Best trios**")
+        col2.dataframe(trios.head(10).round(2), hide_index=True)
+
+
+def bubbe_rating_sweep_section(df, trade_weight, beer_weight):
+    with st.expander("🔬 BubbeRating weight sweep"):
+        col1, col2, col3 = st.columns(3)
+        max_trade = col1.number_input("Max trade weight", min_value=0.1, max_value=10.0, value=2.0)
+        max_beer = col2.number_input("Max beer weight", min_value=0.1, max_value=10.0, value=2.0)
+        steps = col3.number_input("Steps per weight", min_value=2, max_value=200, value=50)
+        full_history = st.checkbox("Use full history (all games in Sheets)")
+
+        if st.button("Run sweep"):
+            with st.spinner("Sweeping weights..."):
+                sweep_df = load_history_stats() if full_history else df
+                if sweep_df.empty:
+                    st.warning("No player data to sweep.")
+                    return
+                stability, combos = sweep(
+                    sweep_df, np.linspace(0, max_trade, steps), np.linspace(0, max_beer, steps),
+                    trade_weight, beer_weight
+                )
+            st.markdown(f"**{len(combos)} weight combinations** over {sweep_df['Game'].nunique()} games")
+            st.dataframe(stability, use_container_width=True)
+            st.caption(f"Spearman vs current weights: median {combos['spearman_vs_baseline'].median():.2f}, "
+                       f"min {combos['spearman_vs_baseline'].min():.2f}")
 
-    return df, grouped
 
 def stats_page(days):
     st.header("Stats")
 
+    with st.expander("⚙️ BubbeRating weights"):
+        trade_weight = st.slider("Trade weight", 0.0, 2.0, TRADE_WEIGHT, 0.05)
+        beer_weight = st.slider("Beer weight", 0.0, 2.0, BEER_WEIGHT, 0.05)
+
     with st.spinner("Loading stats..."):
         df, grouped = load_all_stats(days)
         if df is None or df.empty:
             st.warning("No games found in the selected timeframe.")
             return
+        if (trade_weight, beer_weight) != (TRADE_WEIGHT, BEER_WEIGHT):
+            grouped = aggregate_player_stats(df, trade_weight, beer_weight)
 
         # --- Build Top 3 Table (static, shown first) ---
         stat_options = list(STAT_MAP.keys()) + ["Beer", "Water", "BubbeRating"]
@@ -603,25 +559,56 @@ def stats_page(days):
     stat_options = list(STAT_MAP.keys()) + ["Beer", "Water", "BubbeRating"]
     selected_stat = st.selectbox("Stat to plot", stat_options)
 
-    if selected_stat == "BubbeRating":
-        fig = px.bar(grouped, x="Player", y="BubbeRating",
-                     title="BubbeRating per Player")
-    else:
-        fig = px.bar(df, x="Player", y=selected_stat, color="Game",
-                     barmode="group", title=f"{selected_stat} per Player")
+    # Aggregated server-side for long windows and cached per (stat, window, data version)
+    fig = stat_figure(df, grouped, selected_stat, days, data_version(df), (trade_weight, beer_weight))
 
     st.plotly_chart(fig, use_container_width=True)
 
-    # --- Download CSV of all raw stats ---
-    csv = df.to_csv(index=False)
+    form_section()
+    synergy_section(df, trade_weight, beer_weight)
+    bubbe_rating_sweep_section(df, trade_weight, beer_weight)
+
+    # --- Download all raw stats ---
+    with st.expander("⬇️ Download Selected Stats"):
+        export_controls(df.drop(columns=["game_id", "player_key", *RESULT_COLUMNS]), "all_game_stats", "Download Selected Stats", "selected_stats")
+
+    # Only the request is kept per session; the frame itself lives in the shared, budgeted game cache
+    if st.button("Load Entire Database"):
+        st.session_state['full_database_requested'] = True
+    if st.session_state.get('full_database_requested'):
+        full_df = load_full_database()
+        if full_df is not None:
+            with st.expander("⬇️ Download Entire Database", expanded=True):
+                export_controls(full_df, "all_game_stats_full", "Download Entire Database", "full_database")
+
+
+def export_controls(df, file_stem, label, key):
+    """Format, column and date-range pickers plus a download button. Filters are applied before serializing."""
+    col1, col2 = st.columns(2)
+    fmt = col1.radio("Format", list(EXPORT_FORMATS), horizontal=True, key=f"{key}_format")
+
+    start = end = None
+    dates = pd.to_datetime(df["Date"], errors="coerce").dropna() if "Date" in df.columns else pd.Series(dtype="datetime64[ns]")
+    if not dates.empty:
+        picked = col2.date_input("Date range", (dates.min().date(), dates.max().date()), key=f"{key}_dates")
+        if isinstance(picked, (tuple, list)) and len(picked) == 2:
+            start, end = picked
+
+    columns = st.multiselect("Columns", list(df.columns), default=list(df.columns), key=f"{key}_columns")
+    filtered = filter_export(df, columns, start, end)
+    st.caption(f"{len(filtered)} rows, {len(filtered.columns)} columns")
+    if not columns:
+        st.info("Select at least one column to download.")
+
+    # Serialized only when the button is clicked
     st.download_button(
-        "Download Selected Stats as CSV",
-        data=csv,
-        file_name="all_game_stats.csv",
-        mime="text/csv"
+        label,
+        data=lambda: export_bytes(filtered, fmt),
+        file_name=export_file_name(file_stem, fmt),
+        mime=EXPORT_FORMATS[fmt][1],
+        key=f"{key}_download",
+        disabled=not columns
     )
-    if st.button("Download Entire Database (Full CSV)"):
-        download_full_database()
 
 def Download_Game_Stats(days, game_details_map, konsum_map):
     try:
@@ -636,131 +623,62 @@ def Download_Game_Stats(days, game_details_map, konsum_map):
                 konsum_data = konsum_map.get(game_id, {})
 
                 for player in game_details.get("playerStats", []):
-                    raw_name = player["name"]
-                    mapped_name = NAME_MAPPING.get(raw_name, raw_name)
-                    
-                    if mapped_name in ALLOWED_PLAYERS:
-                        player_data = {
-                            "Game": map_name,
-                            "Player": mapped_name,
-                            "Date": game["game_finished_at"].strftime("%Y-%m-%d %H:%M"),
-                        }
+                    mapped_name = player.name
 
-                        for display_name, stat_key in STAT_MAP.items():
-                            player_data[display_name] = get_player_stat(player, stat_key)
+                    player_data = {
+                        "Game": map_name,
+                        "Player": mapped_name,
+                        "Date": game["game_finished_at"],
+                    }
+
+                    for display_name, stat_key in STAT_MAP.items():
+                        player_data[display_name] = get_player_stat(player, stat_key)
 
-                        player_data["Beer"] = konsum_data.get(mapped_name, {}).get("beer", 0)
-                        player_data["Water"] = konsum_data.get(mapped_name, {}).get("water", 0)
+                    player_data["Beer"] = konsum_data.get(player.player_key, {}).get("beer", 0)
+                    player_data["Water"] = konsum_data.get(player.player_key, {}).get("water", 0)
 
-                        all_game_data.append(player_data)
+                    all_game_data.append(player_data)
 
         if all_game_data:
-            df_full = pd.DataFrame(all_game_data)
-            csv_buffer = StringIO()
-            df_full.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
-
-            st.download_button(
-                label="Klikk her for å laste ned CSV fil",
-                data=csv_data,
-                file_name="all_game_stats.csv",
-                mime="text/csv"
-            )
+            export_controls(pd.DataFrame(all_game_data), "all_game_stats", "Klikk her for å laste ned", "game_stats")
     except Exception as e:
         st.error(f"Error downloading stats: {e}")
 
-def konsum_data_for_game(game_id, konsum_df):
-    """Fetch konsum data for a specific game from konsum_df DataFrame."""
-    try:
-        if konsum_df.empty:
-            return {}
-        
-        game_konsum = konsum_df[konsum_df['game_id'] == str(game_id)]
-        konsum_data = {}
-        for _, row in game_konsum.iterrows():
-            player_name = row['player_name']
-            beer = int(row['beer']) if str(row['beer']).isdigit() else 0
-            water = int(row['water']) if str(row['water']).isdigit() else 0
-            konsum_data[player_name] = {'beer': beer, 'water': water}
-        return konsum_data
-    except Exception as e:
-        print(f"⚠️ Error processing konsum data for {game_id}: {e}")
-        return {}
+def load_full_database():
+    """
+    Every game in Sheets with per-player stats, konsum and BubbeRating as a typed frame (None if empty).
+    Built from the shared games table and konsum counts, and kept in the game cache until either changes.
+    """
+    games_df = shared_games.frame()
+    konsum_version = hash(tuple(shared_konsum.game_version(game_id) for game_id in games_df['game_id']))
+    key = ("full_database", shared_games.version, konsum_version)
+    return game_cache.get_or_build(key, lambda: single_flight.do(key, build_full_database, games_df))
 
-def download_full_database():
-    try:
-        with st.spinner("Fetching ALL games from Google Sheets..."):
-            games_df, konsum_df = fetch_all_sheets_data()
 
+def build_full_database(games_df):
+    try:
+        with st.spinner("Building stats for ALL games..."):
             if games_df.empty:
                 st.warning("No games found in Google Sheets.")
-                return
+                return None
 
             all_game_data = []
+            for game in games_df.sort_values("game_finished_at", ascending=False).to_dict(orient="records"):
+                details = fetch_game_details(game["game_id"]) or {}
+                for row in player_game_rows(game.get("map_name", "Unknown"), details, get_cached_konsum(game["game_id"])):
+                    row["Date"] = game["game_finished_at"]
+                    all_game_data.append(row)
 
-            # Ensure proper types
-            games_df["game_finished_at"] = pd.to_datetime(games_df["game_finished_at"], errors="coerce")
-            # Loop through all games
-            for _, game in games_df.sort_values("game_finished_at", ascending=False).iterrows():
-                game_id = game["game_id"]
-                map_name = game.get("map_name", "Unknown")
-                konsum_data = konsum_data_for_game(game_id, konsum_df)
-
-                details = fetch_game_details(game_id) or {}
-                
-
-                for p in details.get("playerStats", []):
-                    raw_name = p["name"]
-                    mapped_name = NAME_MAPPING.get(raw_name, raw_name)
-                    if mapped_name not in ALLOWED_PLAYERS:
-                        continue
-
-                    player_data = {
-                        "Game": map_name,
-                        "Player": mapped_name,
-                        "Date": game["game_finished_at"].strftime("%Y-%m-%d %H:%M") if pd.notna(game["game_finished_at"]) else "Unknown",
-                    }
-
-                    # Add stats from STAT_MAP
-                    for display_name, stat_key in STAT_MAP.items():
-                        val = p.get(stat_key, 0)
-                        if stat_key == "tradeKillAttemptsPercentage":
-                            val = val * 100
-                        player_data[display_name] = val
-
-                    # Beer & Water from konsum sheet (if exists)
-                    player_data["Beer"] = konsum_data.get(mapped_name, {}).get("beer", 0)
-                    player_data["Water"] = konsum_data.get(mapped_name, {}).get("water", 0)
-
-                    all_game_data.append(player_data)
-
-        if all_game_data:
-            df_full = pd.DataFrame(all_game_data)
-
-            # Optional: BubbeRating per row
-            trade_weight = 0.5
-            beer_weight = 0.9
-            df_full["BubbeRating"] = (
-                df_full["HLTV Rating"]
-                + df_full["HLTV Rating"] * (df_full["Beer"] * beer_weight)
-                + (df_full["TradeAttempts"] / 100) * trade_weight
-            ).round(2)
-
-            csv_buffer = StringIO()
-            df_full.to_csv(csv_buffer, index=False)
-            csv_data = csv_buffer.getvalue()
-
-            st.download_button(
-                label="Download Entire Database (CSV)",
-                data=csv_data,
-                file_name="all_game_stats_full.csv",
-                mime="text/csv"
-            )
-        else:
+        if not all_game_data:
             st.warning("No player data found across all games.")
+            return None
+
+        df_full = add_game_bubbe_rating(pd.DataFrame(all_game_data))
+        return df_full[["Game", "Player", "Date", *STAT_MAP, "Beer", "Water", "BubbeRating"]]
 
     except Exception as e:
-        st.error(f"Error downloading full database: {e}")
+        st.error(f"Error loading full database: {e}")
+        return None
 
 # Motivation Page
 def motivation_page():
@@ -771,6 +689,37 @@ def motivation_page():
         allowfullscreen></iframe>
     """, unsafe_allow_html=True)
 
+# Debug Page
+def debug_page():
+    st.header("🛠️ Memory")
+    rss = rss_mb()
+    col1, col2 = st.columns(2)
+    col1.metric("Process RSS", f"{rss:.0f} MB" if rss is not None else "n/a")
+    col2.metric("Cache budget", f"{MEMORY_BUDGET_MB} MB", help="Set BUBBE_MEMORY_BUDGET_MB to change it")
+
+    # --- This session's state (games and konsum live in the shared tables below, not per session) ---
+    session_sizes = pd.DataFrame(
+        [(key, deep_sizeof(value) / 2**20) for key, value in st.session_state.items()],
+        columns=["Key", "MB"]
+    ).sort_values("MB", ascending=False)
+    st.subheader("Session state")
+    st.dataframe(session_sizes.round(3), hide_index=True)
+
+    # --- Process-wide caches, shared by all sessions ---
+    st.subheader("Process caches")
+    caches = pd.DataFrame([
+        {"Cache": "Leetify games (LRU)", **game_cache.stats()},
+        {"Cache": "Session data (LRU)", **session_cache.stats()},
+    ])
+    st.dataframe(caches, hide_index=True)
+
+    form = form_cache()
+    other = {"form rows": deep_sizeof(form.rows), "form windows": deep_sizeof(list(form.windows.values())),
+             **write_state_sizes()}
+    st.dataframe(pd.DataFrame([(k, v / 2**20) for k, v in other.items()], columns=["State", "MB"]).round(3),
+                 hide_index=True)
+
+
 # Main UI
 def img_to_base64(img_path):
     with open(img_path, "rb") as f:
@@ -795,9 +744,10 @@ st.markdown(html_code, unsafe_allow_html=True)
 
 #Start caching
 initialize_session_state()
+konsum_ingestor().touch()
 
 st.sidebar.title("Navigation")
-page = st.sidebar.radio("Go to", ("🏠 Home", "📝 Konsum", "📊 Stats", "🚽 Motivation"))
+page = st.sidebar.radio("Go to", ("🏠 Home", "📝 Konsum", "📊 Stats", "🚽 Motivation", "🛠️ Debug"))
 
 #Refresh og datepicker
 if "days_value" not in st.session_state:
@@ -829,4 +779,6 @@ elif page == "📝 Konsum":
 elif page == "📊 Stats":
     stats_page(days)
 elif page == "🚽 Motivation":
-    motivation_page()
\ No newline at end of file
+    motivation_page()
+elif page == "🛠️ Debug":
+    debug_page()
\ No newline at end of file
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+from Form import FORM_METRICS, FORM_WINDOWS, FormCache
+
+T0 = pd.Timestamp("2025-01-10 20:00")
+
+
+def game_rows(game_no, players, seed=0):
+    """Per-game stats rows like load_history_stats() for game g<game_no>."""
+    rng = np.random.default_rng(seed * 1000 + game_no)
+    return pd.DataFrame([
+        {"game_id": f"g{game_no}", "Date": T0 + pd.Timedelta(hours=game_no), "player_key": key, "Player": f"P{key}",
+         **{metric: float(rng.integers(0, 10)) for metric in FORM_METRICS}}
+        for key in players
+    ])
+
+
+def players_in(game_no):
+    return [0, 1, 2] if game_no % 2 else [0, 1, 3]
+
+
+def full_cache(frames):
+    cache = FormCache()
+    rows = pd.concat(frames, ignore_index=True)
+    cache.update(rows, {game_id: 1 for game_id in rows["game_id"].unique()})
+    return cache
+
+
+def warm(cache):
+    """Compute every cached series, so update() has windows and series to keep or invalidate."""
+    for key in cache.rows["player_key"].unique():
+        for window in FORM_WINDOWS:
+            cache.series(key, "Beer", window)
+
+
+def assert_same_form(cache, expected):
+    tm.assert_frame_equal(cache.rows.reset_index(drop=True), expected.rows.reset_index(drop=True))
+    for key in expected.rows["player_key"].unique():
+        for metric in FORM_METRICS:
+            for window in FORM_WINDOWS:
+                tm.assert_series_equal(cache.series(key, metric, window), expected.series(key, metric, window))
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    frames = [game_rows(n, players_in(n)) for n in range(12)]
+    cache = FormCache()
+    cache.update(pd.concat(frames[:7], ignore_index=True), {f"g{n}": 1 for n in range(7)})
+    warm(cache)
+    cache.update(pd.concat(frames[7:], ignore_index=True), {f"g{n}": 1 for n in range(7, 12)})
+
+    assert_same_form(cache, full_cache(frames))
+    assert cache.stale_games({f"g{n}": 1 for n in range(12)}) == []
+
+
+def test_changed_game_rebuilds_the_players_after_it():
+    frames = [game_rows(n, players_in(n)) for n in range(12)]
+    cache = full_cache(frames)
+    warm(cache)
+
+    # g4 gets new konsum for everyone, and player 3 is no longer in it
+    frames[4] = game_rows(4, [0, 1], seed=1)
+    assert cache.stale_games({"g4": 2}) == ["g4"]
+    cache.update(frames[4], {"g4": 2})
+
+    assert_same_form(cache, full_cache(frames))
+
+
+def test_empty_batch_does_not_raise():
+    cache = FormCache()
+    cache.update(pd.DataFrame(), {"g1": 1})
+    assert cache.rows.empty
+    assert cache.series(0, "Beer", 5).empty
+
+    cache.update(game_rows(1, [0, 1]), {"g1": 2})
+    cache.update(pd.DataFrame(), {"g2": 1})
+    assert cache.rows["game_id"].unique().tolist() == ["g1"]
+
+
+def test_duplicate_game_and_player_rows_count_once():
+    rows = pd.concat([game_rows(1, [0, 1]), game_rows(1, [0]), game_rows(2, [0])], ignore_index=True)
+    cache = FormCache()
+    cache.update(rows, {"g1": 1, "g2": 1})
+    assert len(cache.rows) == 3
+    assert len(cache.series(0, "Beer", 3)) == 2
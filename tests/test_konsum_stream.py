@@ -0,0 +1,101 @@
+import pandas as pd
+import pytest
+from KonsumStream import KonsumIngestor, LocalEntries
+from Players import UNKNOWN_PLAYER
+
+T0 = pd.Timestamp("2025-01-10 20:00", tz="UTC")
+
+
+def games(*rows):
+    return pd.DataFrame(
+        [{"game_id": game_id, "game_finished_at": finished_at} for game_id, finished_at in rows]
+    )
+
+
+def at(minutes):
+    return (T0 + pd.Timedelta(minutes=minutes)).isoformat()
+
+
+class Saved:
+    """save_entries stand-in that keeps every batch, optionally failing the first calls."""
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, entries):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError("sheets down")
+        self.batches.append(entries)
+        return entries
+
+    def frame(self):
+        return pd.concat(self.batches, ignore_index=True) if self.batches else pd.DataFrame()
+
+
+def test_tick_saves_new_entries_on_the_closest_previous_game():
+    entries = LocalEntries([
+        {"name": "Kåre", "bgdata": "Beer", "datetime": at(10)},
+        {"name": "Nish", "bgdata": "Vann", "datetime": at(70)},
+        {"name": "Stranger", "bgdata": "Beer", "datetime": at(75)},
+        {"name": "Zohan", "bgdata": "Beer", "datetime": at(-60)},
+    ])
+    saved = Saved()
+    ingestor = KonsumIngestor(entries.fetch_since, saved, games(("g1", T0), ("g2", T0 + pd.Timedelta(hours=1))))
+
+    # The entry before the first game is dropped; unknown names are kept with UNKNOWN_PLAYER
+    assert ingestor.tick(now=T0 + pd.Timedelta(hours=2)) == 3
+    rows = saved.frame().set_index("entry_id")
+    assert rows.loc[1, ["game_id", "player_name", "drink_type"]].tolist() == ["g1", "Torgrizz", "beer"]
+    assert rows.loc[2, ["game_id", "player_name", "drink_type"]].tolist() == ["g2", "Sandrizz", "water"]
+    assert rows.loc[3, "player_key"] == UNKNOWN_PLAYER
+    assert ingestor.last_id == 4
+    assert ingestor.saved_total == 3
+
+    # Only entries with a higher id are fetched on the next tick
+    entries.insert("Jimmy", "Beer", at(80))
+    assert ingestor.tick(now=T0 + pd.Timedelta(hours=2)) == 1
+    assert saved.frame()["entry_id"].tolist() == [1, 2, 3, 5]
+    assert ingestor.tick(now=T0 + pd.Timedelta(hours=2)) == 0
+
+
+def test_entries_after_the_last_games_check_wait_for_the_next_check():
+    entries = LocalEntries([{"name": "Kåre", "bgdata": "Beer", "datetime": at(10)}])
+    known = [games(("g1", T0))]
+    saved = Saved()
+    ingestor = KonsumIngestor(entries.fetch_since, saved, refresh_games=lambda df: known[-1], games_interval=30)
+
+    # Logged after this check: a newer game may not be fetched yet
+    assert ingestor.tick(now=T0 + pd.Timedelta(minutes=5)) == 0
+    assert len(ingestor.pending) == 1
+
+    known.append(games(("g1", T0), ("g2", T0 + pd.Timedelta(minutes=8))))
+    assert ingestor.tick(now=T0 + pd.Timedelta(minutes=40)) == 1
+    assert saved.frame()["game_id"].tolist() == ["g2"]
+    assert ingestor.pending.empty
+
+
+def test_failed_save_keeps_the_batch_for_the_next_tick():
+    entries = LocalEntries([{"name": "Kåre", "bgdata": "Beer", "datetime": at(10)}])
+    saved = Saved(fail=1)
+    ingestor = KonsumIngestor(entries.fetch_since, saved, games(("g1", T0)))
+
+    with pytest.raises(RuntimeError):
+        ingestor.tick(now=T0 + pd.Timedelta(hours=1))
+    assert ingestor.last_id == 1
+    assert len(ingestor.pending) == 1
+
+    assert ingestor.tick(now=T0 + pd.Timedelta(hours=1)) == 1
+    assert saved.frame()["entry_id"].tolist() == [1]
+    assert ingestor.pending.empty
+
+
+def test_idle_until_touched():
+    ingestor = KonsumIngestor(LocalEntries().fetch_since, Saved(), idle_after=60)
+    assert not ingestor.idle()
+    ingestor.last_active -= 120
+    assert ingestor.idle()
+    ingestor.touch()
+    assert not ingestor.idle()
+    assert not KonsumIngestor(LocalEntries().fetch_since, Saved()).idle()
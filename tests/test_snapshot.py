@@ -0,0 +1,55 @@
+import time
+import Leetify
+import Snapshot
+
+
+def use_store(monkeypatch, path, mode):
+    store = Snapshot.SnapshotStore(str(path))
+    monkeypatch.setattr(Snapshot, "store", store)
+    monkeypatch.setattr(Snapshot, "MODE", mode)
+    return store
+
+
+def test_record_then_replay_round_trip(tmp_path, monkeypatch):
+    path = tmp_path / "bubbe.pkl.gz"
+    calls = []
+
+    @Snapshot.recorded("echo", key=lambda n: n)
+    def echo(n):
+        calls.append(n)
+        return {"v": n}
+
+    store = use_store(monkeypatch, path, "record")
+    assert [echo(n) for n in range(5)] == [{"v": n} for n in range(5)]
+    store.flush()  # what the atexit hook runs
+
+    use_store(monkeypatch, path, "replay")
+    assert [echo(n) for n in range(5)] == [{"v": n} for n in range(5)]
+    assert calls == list(range(5))
+
+
+def test_recorded_responses_are_flushed_without_an_explicit_save(tmp_path, monkeypatch):
+    path = tmp_path / "bubbe.pkl.gz"
+    monkeypatch.setattr(Snapshot, "SAVE_INTERVAL_SECONDS", 0.05)
+    store = use_store(monkeypatch, path, "record")
+    for n in range(5):
+        store.record("echo", n, {"v": n}, 0.0)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and len(Snapshot.SnapshotStore(str(path)).load().calls.get("echo", {})) < 5:
+        time.sleep(0.05)
+    assert len(Snapshot.SnapshotStore(str(path)).load().calls["echo"]) == 5
+
+
+def test_replayed_game_details_are_cached_and_projected(tmp_path, monkeypatch):
+    store = use_store(monkeypatch, tmp_path / "bubbe.pkl.gz", "replay")
+    game_id = "snapshot-test-game"
+    store.record("fetch_raw_game_details", game_id, {"playerStats": [{"name": "Kåre", "hltvRating": 1.5}]}, 0.0)
+
+    lookups = []
+    lookup = store.lookup
+    monkeypatch.setattr(store, "lookup", lambda name, key: lookups.append(key) or lookup(name, key))
+    first = Leetify.fetch_game_details(game_id)
+    assert Leetify.fetch_game_details(game_id) is first
+    assert lookups == [game_id]
+    assert [(p.name, p.hltvRating) for p in first["playerStats"]] == [("Torgrizz", 1.5)]
@@ -0,0 +1,45 @@
+import pandas as pd
+from Leetify import project_game
+from Stats import player_game_rows
+from Synergy import best_groups, synergy_matrices
+
+
+def stats_rows(games):
+    rows = []
+    for game_id, details in games.items():
+        for row in player_game_rows(game_id, project_game(details), {}):
+            rows.append({"game_id": game_id, **row})
+    return pd.DataFrame(rows)
+
+
+def player(name, team=None):
+    stats = {"name": name, "hltvRating": 1.0}
+    return stats if team is None else {**stats, "initialTeamNumber": team}
+
+
+GAMES = {
+    # Torgrizz and Jorizz win on team 2 against Sandrizz on team 3
+    "g1": {"playerStats": [player("Kåre", 2), player("Nish", 3), player("Zohan", 2)],
+           "teamScores": [{"teamNumber": 2, "score": 13}, {"teamNumber": 3, "score": 7}]},
+    # No team data: everyone gets the profile owner's result
+    "g2": {"playerStats": [player("Kåre"), player("Nish")]},
+}
+OWNER_WINS = pd.Series([False, True], index=["g1", "g2"])
+
+
+def test_players_on_opposite_teams_are_not_together():
+    matrices = synergy_matrices(stats_rows(GAMES), OWNER_WINS)
+    shared, win_rate = matrices["Shared games"], matrices["Win rate"]
+
+    assert shared.loc["Torgrizz", "Jorizz"] == 1
+    assert shared.loc["Torgrizz", "Sandrizz"] == 1  # only g2, where teams are unknown
+    assert shared.loc["Sandrizz", "Jorizz"] == 0
+    # Each player's own team result, not the owner's loss in g1
+    assert win_rate.loc["Torgrizz", "Torgrizz"] == 1.0
+    assert win_rate.loc["Sandrizz", "Sandrizz"] == 0.5
+
+
+def test_best_duos_use_the_teams_result():
+    duos = best_groups(stats_rows(GAMES), OWNER_WINS, size=2, min_games=1).set_index("Players")
+    assert duos.loc["Jorizz + Torgrizz", "Win rate"] == 1.0
+    assert "Jorizz + Sandrizz" not in duos.index